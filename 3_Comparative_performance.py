@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 from performance_analyzer import analyze_tickers
+from market_cache import canonical_tickers
 
 st.title("📈 Performance Comparison")
 
@@ -25,7 +26,7 @@ except:
 
 if st.button("Load Charts"):
     # Include benchmark in analysis
-    all_tickers = list(set(tickers + [benchmark]))
+    all_tickers = list(canonical_tickers(tickers + [benchmark]))
 
     cum_df, metrics = analyze_tickers(all_tickers, period=period, risk_free_rate=risk_free_rate)
 
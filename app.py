@@ -1,16 +1,58 @@
+import os
+import threading
+import time
 import streamlit as st
-# 🔍 PUBLIC STATUS MONITOR (add after imports in app.py)
+from health_monitor import HealthMonitor
+from warmup import read_universe, warm_up
+
+
+# Optional in-process warm-up (once per server process) so the memory caches are hot too
+@st.cache_resource(show_spinner=False)
+def start_warmup(universe_path: str):
+    thread = threading.Thread(target=warm_up, args=(read_universe(universe_path),), name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+if os.environ.get("WARMUP_UNIVERSE"):
+    start_warmup(os.environ["WARMUP_UNIVERSE"])
+
+# 🔍 PUBLIC STATUS MONITOR: rendered from the background probe, no upstream call per rerun
+@st.cache_resource(show_spinner=False)
+def get_health_monitor():
+    return HealthMonitor().start()
+
+
+def _ms(seconds):
+    return "–" if seconds is None else f"{seconds * 1000:.0f} ms"
+
+
 with st.sidebar:
     st.markdown("### 🟢 Connection Status")
-    try:
-        import yfinance as yf
-        test_info = yf.Ticker("SPY").info
-        if test_info:
-            st.sidebar.success("✅ Live data: OK")
-        else:
-            st.sidebar.warning("⚠️ Cache mode")
-    except:
+    health = get_health_monitor().status()
+    if health["state"] == "ok":
+        st.sidebar.success("✅ Live data: OK")
+    elif health["state"] == "degraded":
+        st.sidebar.warning("⚠️ Live data: degraded")
+    elif health["state"] == "down":
         st.sidebar.info("💾 Using cached data")
+    else:
+        st.sidebar.info("⏳ Checking connection...")
+
+    with st.expander("Data health", expanded=False):
+        fetch = health["fetch"]
+        hit_ratio = health["cache_hit_ratio"]
+        col_a, col_b = st.columns(2)
+        col_a.metric("Fetch p50", _ms(fetch["p50"]))
+        col_b.metric("Fetch p95", _ms(fetch["p95"]))
+        col_a.metric("Cache hit ratio", "–" if hit_ratio is None else f"{hit_ratio:.0%}")
+        success = health["probe"]["success_rate"]
+        col_b.metric("Probe success", "–" if success is None else f"{success:.0%}")
+        if health["last_probe_at"]:
+            st.caption(f"Last probe {time.time() - health['last_probe_at']:.0f}s ago · "
+                       f"{fetch['count']} recent fetches")
+        if health["last_error"]:
+            st.caption(f"Last error: {health['last_error']}")
 
 st.set_page_config(page_title="Dom's Analytics Platform", layout="wide")
 
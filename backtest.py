@@ -0,0 +1,291 @@
+"""
+backtest.py
+Historical scorecard backtest. create_scorecard's logic (z-score every factor across the
+universe, weighted sum, rank) is applied at every rebalance date at once over a
+(dates x tickers x factors) tensor built from factor_history, then the forward returns of
+the rank buckets are measured until the next rebalance.
+
+Each rebalance date is one normalization group (normalization.py), so all dates are
+z-scored in a single grouped pass; scores are one weighted sum over the factor axis and
+ranks / buckets / bucket returns are row-wise array operations - no per-date loop.
+
+Only price factors have a history (factor_history.FACTORS). Its Growth is the 1-year
+price change, not create_scorecard's earnings / revenue Growth, so it is offered here as
+PriceGrowth (the name FACTOR_SETS["all"] uses). Info factors (Value, Growth, Size, Cost,
+Quality) can be passed as static_factors, but today's fundamentals applied to the past
+carry look-ahead bias; weights for factors without data are skipped, as in create_scorecard.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Union
+
+import numpy as np
+import pandas as pd
+
+import factor_history
+import normalization
+import price_panel
+from screener_engine_v2 import ETF_WEIGHTS, LOWER_IS_BETTER, rank_rows, weight_matrix
+
+FILL_LIMIT = 5  # bars a price / factor value is carried to a rebalance date (holidays, other exchanges)
+
+# factor_history columns whose definition differs from create_scorecard's factor of the same name
+HISTORY_NAMES = {"Growth": "PriceGrowth"}
+
+
+class BacktestResult(NamedTuple):
+    scores: pd.DataFrame           # rebalance dates x tickers, Final Score (NaN = not eligible)
+    ranks: pd.DataFrame            # rebalance dates x tickers, Rank (1 = best)
+    buckets: pd.DataFrame          # rebalance dates x tickers, bucket number (1 = top)
+    forward_returns: pd.DataFrame  # rebalance dates x tickers, return until the next rebalance
+    bucket_returns: pd.DataFrame   # rebalance dates x (Q1..Qn, Top - Bottom[, Benchmark]), equal weight
+    ic: pd.Series                  # rank correlation of score and forward return per date
+    summary: pd.DataFrame          # per bucket: annual return / volatility, Sharpe, win rate
+
+
+# --------------------------
+# Rebalance calendar
+# --------------------------
+
+def rebalance_positions(dates: pd.DatetimeIndex, rebalance: Union[str, int] = "M") -> np.ndarray:
+    """Row positions of the rebalance dates: last bar of each W / M / Q / Y period, or every N bars."""
+    if isinstance(rebalance, int):
+        return np.arange(0, len(dates), rebalance)
+    periods = dates.to_period(rebalance).asi8
+    return np.flatnonzero(np.append(periods[1:] != periods[:-1], True))
+
+
+# --------------------------
+# Tensor
+# --------------------------
+
+def factor_tensor(history: Dict[str, pd.DataFrame], positions: np.ndarray, factors: List[str],
+                  static_factors: pd.DataFrame = None) -> np.ndarray:
+    """dates x tickers x factors at the rebalance rows; static factors are repeated on every date."""
+    any_frame = next(iter(history.values()))
+    tensor = np.full((len(positions), any_frame.shape[1], len(factors)), np.nan)
+    for k, factor in enumerate(factors):
+        if factor in history:
+            tensor[:, :, k] = history[factor].ffill(limit=FILL_LIMIT).to_numpy()[positions]
+        elif static_factors is not None and factor in static_factors.columns:
+            tensor[:, :, k] = static_factors[factor].reindex(any_frame.columns).to_numpy()[None, :]
+    return tensor
+
+
+def zscore_tensor(tensor: np.ndarray, eligible: np.ndarray, factors: List[str], benchmark: int = None,
+                  group_by: Any = None, method: str = "zscore", winsorize: float = None,
+                  min_group_size: int = 1) -> np.ndarray:
+    """
+    ScoringSession.zscores for every date at once: each date (or date x group) is one
+    normalization group over the eligible tickers; optionally anchored to the benchmark.
+    Unlabelled tickers and groups with fewer than min_group_size values use their date's stats.
+    """
+    d, n, f = tensor.shape
+    values = np.where(eligible[..., None], tensor, np.nan).reshape(d * n, f)
+    date_labels = np.repeat(np.arange(d), n)
+    stats = normalization.row_stats(values, date_labels, method, winsorize)
+    if group_by is not None:
+        codes, labels = normalization.group_codes(group_by, n)
+        codes = np.tile(codes, d)
+        grouped = normalization.row_stats(values, np.where(codes >= 0, date_labels * len(labels) + codes, -1),
+                                          method, winsorize)
+        use_date = (codes < 0)[:, None] | (grouped.count < min_group_size)
+        stats = normalization.RowStats(*(np.where(use_date, a, b) for a, b in zip(stats, grouped)))
+
+    center = stats.center
+    if benchmark is not None:
+        center = np.repeat(stats.values.reshape(d, n, f)[:, benchmark], n, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = (stats.values - center) / stats.scale
+    z[(stats.scale == 0) | np.isnan(stats.scale)] = 0.0
+    z[stats.count == 0] = np.nan
+    sign = np.array([-1.0 if factor in LOWER_IS_BETTER else 1.0 for factor in factors])
+    return (z * sign).reshape(d, n, f)
+
+
+# --------------------------
+# Buckets and returns
+# --------------------------
+
+def bucket_members(ranks: np.ndarray, eligible: np.ndarray, n_buckets: int) -> np.ndarray:
+    """Bucket 1..n_buckets by rank within each date's eligible tickers (0 = not eligible)."""
+    count = eligible.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        buckets = np.floor((ranks - 1) * n_buckets / count).astype(np.int64) + 1
+    return np.where(eligible, np.minimum(buckets, n_buckets), 0)
+
+
+def bucket_means(values: np.ndarray, buckets: np.ndarray, n_buckets: int) -> np.ndarray:
+    """dates x buckets equal-weight mean of `values` (NaN values are left out)."""
+    d = values.shape[0]
+    use = (buckets > 0) & ~np.isnan(values)
+    keys = (np.arange(d)[:, None] * n_buckets + buckets - 1)[use]
+    total = np.bincount(keys, weights=values[use], minlength=d * n_buckets)
+    count = np.bincount(keys, minlength=d * n_buckets)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (total / count).reshape(d, n_buckets)
+
+
+def rank_ic(scores: np.ndarray, returns: np.ndarray) -> np.ndarray:
+    """Per row Spearman correlation of scores and returns over the pairs where both exist."""
+    both = ~np.isnan(scores) & ~np.isnan(returns)
+
+    def _ranks(a):
+        a = np.where(both, a, -np.inf)
+        r = rank_rows(a).astype(np.float64)
+        return np.where(both, r, np.nan)
+
+    x, y = _ranks(scores), _ranks(returns)
+    count = both.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x -= np.nansum(x, axis=1, keepdims=True) / count
+        y -= np.nansum(y, axis=1, keepdims=True) / count
+        return np.nansum(x * y, axis=1) / np.sqrt(np.nansum(x * x, axis=1) * np.nansum(y * y, axis=1))
+
+
+def performance_summary(returns: pd.DataFrame, periods_per_year: float) -> pd.DataFrame:
+    """Annualized geometric return, volatility, Sharpe (rf = 0) and win rate per column."""
+    values = returns.to_numpy()
+    n = (~np.isnan(values)).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        growth = np.exp(np.nansum(np.log1p(values), axis=0))
+        annual_return = growth ** (periods_per_year / n) - 1
+        annual_vol = np.nanstd(values, axis=0, ddof=1) * np.sqrt(periods_per_year)
+        win_rate = (values > 0).sum(axis=0) / n
+    return pd.DataFrame({
+        "Annual Return": annual_return,
+        "Annual Volatility": annual_vol,
+        "Sharpe Ratio": annual_return / annual_vol,
+        "Win Rate": win_rate,
+        "Periods": n,
+    }, index=returns.columns)
+
+
+# --------------------------
+# Entry points
+# --------------------------
+
+class _Panel(NamedTuple):
+    dates: pd.DatetimeIndex   # rebalance dates
+    tickers: pd.Index
+    factors: List[str]        # factor axis of z
+    z: np.ndarray             # dates x tickers x factors z-scores
+    eligible: np.ndarray      # dates x tickers
+    forward: np.ndarray       # dates x tickers, return until the next rebalance
+    benchmark: int            # column of the benchmark (None if absent)
+
+
+def _prepare(prices: Dict[str, Any], factors: List[str], period: str = "5y", rebalance: Union[str, int] = "M",
+             benchmark_ticker: str = None, history: Dict[str, pd.DataFrame] = None,
+             static_factors: pd.DataFrame = None, group_by: Any = None, method: str = "zscore",
+             winsorize: float = None, min_group_size: int = 1) -> _Panel:
+    """Everything that does not depend on the weights: aligned prices, factor tensor, z-scores."""
+    aligned = price_panel.align_panel(prices)
+    if history is None:
+        history = factor_history.compute_factor_history(prices, period)
+    history = {HISTORY_NAMES.get(f, f): frame for f, frame in history.items()}
+    factors = [f for f in factors if f in history or (static_factors is not None and f in static_factors.columns)]
+    if aligned.empty or not factors:
+        raise ValueError("Nothing to backtest: no prices or none of the weighted factors has data")
+    history = {f: frame.reindex(index=aligned.index, columns=aligned.columns) for f, frame in history.items()}
+
+    positions = rebalance_positions(aligned.index, rebalance)
+    tickers = aligned.columns
+    filled = aligned.ffill(limit=FILL_LIMIT).to_numpy(dtype=np.float64)[positions]
+
+    tensor = factor_tensor(history, positions, factors, static_factors)
+    eligible = ~np.isnan(filled) & (~np.isnan(tensor)).any(axis=2)
+    benchmark = tickers.get_loc(benchmark_ticker) if benchmark_ticker in tickers else None
+    if isinstance(group_by, pd.Series):
+        group_by = group_by.reindex(tickers).to_numpy()
+    z = zscore_tensor(tensor, eligible, factors, benchmark, group_by, method, winsorize, min_group_size)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        forward = np.vstack([filled[1:] / filled[:-1] - 1, np.full((1, len(tickers)), np.nan)])
+    return _Panel(aligned.index[positions], tickers, factors, z, eligible, forward, benchmark)
+
+
+def _score(panel: _Panel, weights: np.ndarray, n_buckets: int):
+    """
+    Scores / ranks / buckets (scenarios x dates x tickers) and bucket returns (scenarios x
+    dates x buckets) for every weight row at once: one (scenarios x factors) @ z product.
+    """
+    d, n, f = panel.z.shape
+    s = len(weights)
+    z = np.nan_to_num(panel.z, nan=0.0).reshape(d * n, f)  # NaN factors count as 0
+    eligible = np.broadcast_to(panel.eligible, (s, d, n)).reshape(s * d, n)
+    scores = np.where(eligible, (weights @ z.T).reshape(s * d, n), np.nan)
+    ranks = np.where(eligible, rank_rows(np.where(eligible, scores, -np.inf)), 0)
+    buckets = bucket_members(ranks, eligible, n_buckets)
+    forward = np.broadcast_to(panel.forward, (s, d, n)).reshape(s * d, n)
+    returns = bucket_means(forward, buckets, n_buckets)
+    return (scores.reshape(s, d, n), ranks.reshape(s, d, n), buckets.reshape(s, d, n),
+            returns.reshape(s, d, n_buckets), rank_ic(scores, forward).reshape(s, d))
+
+
+def _periods_per_year(dates: pd.DatetimeIndex) -> float:
+    return 365.25 / (dates.to_series().diff().median() / pd.Timedelta(days=1))
+
+
+def run_backtest(prices: Dict[str, Any], weights: Dict[str, float] = None, period: str = "5y",
+                 rebalance: Union[str, int] = "M", n_buckets: int = 5, benchmark_ticker: str = None,
+                 history: Dict[str, pd.DataFrame] = None, static_factors: pd.DataFrame = None,
+                 group_by: Any = None, method: str = "zscore", winsorize: float = None,
+                 min_group_size: int = 1) -> BacktestResult:
+    """
+    Score and bucket the universe at every rebalance date and measure each bucket's
+    equal-weight return until the next one.
+
+    prices: ticker -> prices (anything price_panel.align_panel takes).
+    history: precomputed factor_history.compute_factor_history(prices, period) output
+             (e.g. from load_factor_history); computed here if not given. Its price-based
+             Growth is weighted as "PriceGrowth"; "Growth" needs a static_factors column.
+    A ticker is eligible on a date if it has a price there and at least one weighted factor.
+    """
+    weights = ETF_WEIGHTS if weights is None else weights
+    panel = _prepare(prices, list(weights), period, rebalance, benchmark_ticker, history, static_factors,
+                     group_by, method, winsorize, min_group_size)
+    w = weight_matrix([weights], panel.factors).to_numpy()
+    scores, ranks, buckets, returns, ic = (a[0] for a in _score(panel, w, n_buckets))
+    dates, tickers = panel.dates, panel.tickers
+
+    names = [f"Q{b}" for b in range(1, n_buckets + 1)]
+    bucket_returns = pd.DataFrame(returns, index=dates, columns=names)
+    bucket_returns["Top - Bottom"] = bucket_returns[names[0]] - bucket_returns[names[-1]]
+    if panel.benchmark is not None:
+        bucket_returns["Benchmark"] = panel.forward[:, panel.benchmark]
+    bucket_returns = bucket_returns.iloc[:-1]  # the last rebalance has no forward return yet
+
+    return BacktestResult(
+        scores=pd.DataFrame(scores, index=dates, columns=tickers),
+        ranks=pd.DataFrame(np.where(panel.eligible, ranks, np.nan), index=dates, columns=tickers),
+        buckets=pd.DataFrame(buckets, index=dates, columns=tickers),
+        forward_returns=pd.DataFrame(panel.forward, index=dates, columns=tickers),
+        bucket_returns=bucket_returns,
+        ic=pd.Series(ic, index=dates, name="IC").iloc[:-1],
+        summary=performance_summary(bucket_returns, _periods_per_year(dates)),
+    )
+
+
+def compare_weights(prices: Dict[str, Any], weight_scenarios, n_buckets: int = 5, **kwargs) -> pd.DataFrame:
+    """
+    One row per weight scenario (see screener_engine_v2.weight_matrix for the accepted
+    forms): top / bottom bucket annual return, spread Sharpe and mean IC - the same
+    numbers as run_backtest per scenario. The z-score tensor is built once and every
+    scenario is scored by one (scenarios x factors) @ z product, as score_scenarios does.
+    kwargs: run_backtest's other arguments.
+    """
+    scenarios = weight_matrix(weight_scenarios)
+    panel = _prepare(prices, list(scenarios.columns), **kwargs)
+    _, _, _, returns, ic = _score(panel, scenarios[panel.factors].to_numpy(), n_buckets)
+
+    returns = returns[:, :-1]  # the last rebalance has no forward return yet
+    top, bottom = returns[:, :, 0], returns[:, :, -1]
+    series = pd.DataFrame(np.hstack([top.T, bottom.T, (top - bottom).T]))
+    summary = performance_summary(series, _periods_per_year(panel.dates))
+    s = len(scenarios)
+    return pd.DataFrame({
+        "Top Annual Return": summary["Annual Return"].to_numpy()[:s],
+        "Bottom Annual Return": summary["Annual Return"].to_numpy()[s:2 * s],
+        "Spread Sharpe": summary["Sharpe Ratio"].to_numpy()[2 * s:],
+        "Mean IC": pd.DataFrame(ic[:, :-1]).mean(axis=1).to_numpy(),
+    }, index=scenarios.index)
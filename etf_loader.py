@@ -1,65 +1,364 @@
 import yfinance as yf
 import pandas as pd
-from typing import List, Dict, Any
-import streamlit as st
+from typing import List, Dict, Any, Tuple
+from concurrent.futures import TimeoutError as FutureTimeout
+import os
 from functools import lru_cache
-import time
-
-
-# Global cache for yfinance data (persists across reruns)
-@st.cache_data(ttl=86400*7, show_spinner=False, max_entries=500)  # 7 days + bigger cache
-def load_price_data(ticker: str, period="max", interval="1d") -> pd.DataFrame:
-    """Download OHLCV + Adj Close for a single ETF with rate limit protection."""
-    time.sleep(0.1)  # Rate limiting
-    df = yf.download(
-        ticker,
-        period=period,
-        interval=interval,
-        auto_adjust=False,
-        progress=False,
-        threads=False  # Single thread to avoid rate limits
-    )
-    return df
-
-
-@st.cache_data(ttl=3600, show_spinner=False)
+import price_store
+import streaming_state  # noqa: F401 - keeps the streaming accumulators in step with the store
+from fetch_executor import BATCH_CHUNK_SIZE, UpstreamError, get_executor, is_outage_message, throttle
+from market_cache import FAILURE_CACHE, INFO_CACHE, PRICE_CACHE, canonical_tickers
+from single_flight import FLIGHTS
+from price_series import PriceSeries
+from fundamentals import RAW_INFO
+
+# Longest a page waits on a fetch (its own or another session's) before serving stale data
+SETTLE_TIMEOUT_SECONDS = float(os.environ.get("SETTLE_TIMEOUT_SECONDS", 120))
+
+
+def _download(tickers, **kwargs) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    """
+    yf.download plus its per-symbol error messages: yfinance catches every per-symbol
+    exception (connection refused, rate limit, delisted, ...) and only logs it.
+    """
+    ctx_type = getattr(yf.multi, "_DownloadCtx", None)
+    if ctx_type is not None:  # yfinance >= 1.x keeps the errors on a per-call context
+        ctx = ctx_type()
+        return yf.multi._download_impl(ctx, tickers, **kwargs), dict(ctx.errors)
+    raw = yf.download(tickers, **kwargs)
+    return raw, dict(getattr(yf.shared, "_ERRORS", {}))
+
+
+def _upstream_error(errors: Dict[str, str]) -> UpstreamError:
+    """Transport / 429 / 5xx errors among the per-symbol messages (unknown symbols are not)."""
+    outages = {symbol: message for symbol, message in errors.items() if is_outage_message(message)}
+    if not outages:
+        return None
+    symbol, message = next(iter(outages.items()))
+    return UpstreamError(f"{len(outages)} symbol(s) failed upstream, e.g. {symbol}: {message}")
+
+
+def download_prices(ticker: str, interval: str = "1d", period: str = None, start=None) -> pd.DataFrame:
+    """Raw upstream download of OHLCV + Adj Close (either a period or everything since `start`)."""
+    with throttle():
+        df, errors = _download(
+            ticker,
+            period=period if start is None else None,
+            start=start,
+            interval=interval,
+            auto_adjust=False,
+            progress=False,
+            threads=False  # Concurrency is handled by the fetch executor
+        )
+        error = _upstream_error(errors)
+        if error is not None:
+            raise error  # counts against the breaker
+    if df is None or df.empty:
+        raise ValueError(f"No price data returned for {ticker}")  # unknown symbol, not an outage
+    return price_store.flatten_columns(df)
+
+
+def load_price_history(ticker: str, period="max", interval="1d") -> pd.DataFrame:
+    """
+    Store-first price loader: reads the local Parquet history, fetches only bars
+    after the last stored date, appends them, and returns the requested period.
+    """
+    if not price_store.is_storable(interval):
+        return download_prices(ticker, interval, period=period)
+
+    stored = price_store.read_prices(ticker, interval)
+    if stored.empty:
+        full = price_store.append_prices(ticker, interval, stored, download_prices(ticker, interval, period="max"))
+    elif price_store.needs_refresh(ticker, interval):
+        try:
+            new_bars = download_prices(ticker, interval, start=price_store.refresh_start(stored))
+            if price_store.is_revised(stored, new_bars):
+                full = price_store.replace_prices(ticker, interval, download_prices(ticker, interval, period="max"))
+            else:
+                full = price_store.append_prices(ticker, interval, stored, new_bars)
+        except Exception as e:
+            print(f"⚠️ Incremental refresh failed for {ticker}, serving stored history: {e}")
+            full = stored
+    else:
+        full = stored
+
+    return price_store.slice_period(full, period)
+
+
+def split_grouped_frame(raw: pd.DataFrame, tickers: List[str]) -> Dict[str, pd.DataFrame]:
+    """Split a group_by="ticker" multi-symbol download into one frame per ticker."""
+    frames = {}
+    if raw is None or raw.empty:
+        return frames
+
+    if not isinstance(raw.columns, pd.MultiIndex):
+        # yfinance returns flat columns when only one symbol was requested
+        if len(tickers) == 1:
+            frames[tickers[0]] = raw.dropna(how="all")
+        return frames
+
+    available = set(raw.columns.get_level_values(0))
+    for ticker in tickers:
+        if ticker not in available:
+            continue
+        df = raw[ticker].dropna(how="all")
+        if not df.empty:
+            frames[ticker] = df
+    return frames
+
+
+def _download_chunk(chunk: Tuple[str, ...], interval: str, period: str, start) -> Dict[str, pd.DataFrame]:
+    tickers = list(chunk)
+    # threads=False: yfinance requests the symbols one after another on the single host slot
+    # this call holds, and the chunk pays one token per symbol
+    with throttle(cost=len(tickers)) as request:
+        raw, errors = _download(
+            tickers,
+            period=period if start is None else None,
+            start=start,
+            interval=interval,
+            auto_adjust=False,
+            progress=False,
+            group_by="ticker",
+            threads=False
+        )
+        error = _upstream_error(errors)
+        if error is not None:
+            request.fail(error)  # counts against the breaker; symbols that came back are kept
+    if raw is None or raw.empty:
+        raise error or ValueError(f"No price data returned for {len(tickers)} tickers")
+    return split_grouped_frame(raw, tickers)
+
+
+def download_prices_batch(tickers: List[str], interval: str = "1d", period: str = None, start=None) -> Dict[str, pd.DataFrame]:
+    """
+    Multi-symbol download in BATCH_CHUNK_SIZE chunks, run concurrently on the fetch executor
+    (so at most the host limit of chunks are in flight). Returns only the tickers that came
+    back with data; raises only if every chunk failed. Not for use inside executor workers.
+    """
+    if not tickers:
+        return {}
+    chunks = [tuple(tickers[i:i + BATCH_CHUNK_SIZE]) for i in range(0, len(tickers), BATCH_CHUNK_SIZE)]
+    if len(chunks) == 1:
+        return _download_chunk(chunks[0], interval, period, start)
+
+    loaded, errors = get_executor().map(_download_chunk, chunks, interval=interval, period=period, start=start)
+    if not loaded:
+        raise next(iter(errors.values()))
+    for chunk, e in errors.items():
+        print(f"⚠️ Batched download failed for {len(chunk)} of {len(tickers)} tickers: {e}")
+    return {ticker: df for frames in loaded.values() for ticker, df in frames.items()}
+
+
+def load_price_histories(tickers: List[str], period="max", interval="1d") -> Dict[str, pd.DataFrame]:
+    """
+    Batched, store-first version of load_price_history.
+    Cold tickers are fetched in one "max" call, stale ones in one incremental call.
+    Tickers missing from the result failed upstream and should be retried individually.
+    """
+    if not price_store.is_storable(interval):
+        frames = download_prices_batch(tickers, interval, period=period)
+        return {t: price_store.flatten_columns(df) for t, df in frames.items()}
+
+    stored = {t: price_store.read_prices(t, interval) for t in tickers}
+    cold = [t for t, df in stored.items() if df.empty]
+    stale = [t for t, df in stored.items() if not df.empty and price_store.needs_refresh(t, interval)]
+
+    fetched, refreshed = {}, set()
+    try:
+        fetched.update(download_prices_batch(cold, interval, period="max"))
+    except Exception as e:
+        print(f"⚠️ Batched download failed for {len(cold)} tickers: {e}")
+    if stale:
+        since = min(price_store.refresh_start(stored[t]) for t in stale)
+        try:
+            fetched.update(download_prices_batch(stale, interval, start=since))
+            refreshed.update(stale)
+        except Exception as e:
+            print(f"⚠️ Batched refresh failed, serving stored history: {e}")
+
+    # Re-adjusted upstream (split / dividend): replace the whole history instead of appending
+    revised = [t for t in refreshed if t in fetched and price_store.is_revised(stored[t], fetched[t])]
+    replaced = {}
+    if revised:
+        try:
+            replaced = download_prices_batch(revised, interval, period="max")
+        except Exception as e:
+            print(f"⚠️ Full re-download failed for {len(revised)} re-adjusted tickers: {e}")
+
+    results = {}
+    for ticker in tickers:
+        if ticker in revised:
+            # Not appended either way; without a full re-download the (consistent) stored
+            # history is served and the file stays due for refresh
+            full = price_store.replace_prices(ticker, interval, replaced[ticker]) if ticker in replaced else stored[ticker]
+        elif ticker in fetched or ticker in refreshed:
+            full = price_store.append_prices(ticker, interval, stored[ticker], fetched.get(ticker, pd.DataFrame()))
+        elif ticker in cold:
+            continue  # Failed: caller falls back to a per-ticker retry
+        else:
+            full = stored[ticker]
+        results[ticker] = price_store.slice_period(full, period)
+    return results
+
+
+# Per-ticker caches (market_cache) shared across sessions: one compact full-history
+# PriceSeries (Adj Close only) per (ticker, interval) and one info dict per ticker.
+# Period views are slices, not copies. Cache misses go through FLIGHTS, so concurrent
+# sessions share one in-flight fetch.
+def _cache_prices(ticker: str, interval: str, price_df: pd.DataFrame) -> PriceSeries:
+    series = PriceSeries.from_frame(price_df, name=ticker)
+    if series.empty:
+        raise ValueError("Empty price data")
+    PRICE_CACHE.put((ticker, interval), series)
+    return series
+
+
+def _load_and_cache_prices(ticker: str, interval="1d") -> PriceSeries:
+    """Load the full history (store first) and cache it; an empty series counts as a failure."""
+    return _cache_prices(ticker, interval, load_price_history(ticker, "max", interval))
+
+
+def fetch_price_data(ticker: str, interval="1d") -> PriceSeries:
+    return FLIGHTS.do(("prices", ticker, interval), _load_and_cache_prices, ticker, interval)
+
+
+def load_price_data(ticker: str, interval="1d") -> PriceSeries:
+    """Full Adj Close history for a single ETF, served from the cache / local price store."""
+    series = PRICE_CACHE.get((ticker, interval))
+    return series if series is not None else fetch_price_data(ticker, interval)
+
+
+def _load_and_cache_info(ticker: str) -> Dict[str, Any]:
+    with throttle():
+        info_dict = yf.Ticker(ticker).info
+    INFO_CACHE.put(ticker, info_dict)
+    RAW_INFO.put(ticker, info_dict)
+    return info_dict
+
+
+def fetch_info_data(ticker: str) -> Dict[str, Any]:
+    return FLIGHTS.do(("info", ticker), _load_and_cache_info, ticker)
+
+
 def load_info_data(ticker: str) -> Dict[str, Any]:
     """Download ETF metadata with caching."""
-    time.sleep(0.1)  # Rate limiting
-    return yf.Ticker(ticker).info
+    info_dict = INFO_CACHE.get(ticker)
+    return info_dict if info_dict is not None else fetch_info_data(ticker)
 
 
-@st.cache_data(ttl=86400 * 7, hash_funcs={pd.DataFrame: id}, max_entries=500)
-def load_etfs(tickers: List[str], period="max", interval="1d", max_retries=3) -> Dict[str, Dict[str, Any]]:
-    """Bulletproof loader with retries + fallbacks."""
-    results = {}
+# Stale-while-revalidate: stale entries are refreshed through the same single-flight fetchers
+PRICE_CACHE.refresher = lambda key: fetch_price_data(*key)
+INFO_CACHE.refresher = fetch_info_data
 
-    for ticker in tickers:
-        for attempt in range(max_retries):
-            try:
-                print(f"📥 [{attempt + 1}/{max_retries}] Downloading: {ticker}")
 
-                # Price data with retry
-                price_df = load_price_data(ticker, period, interval)
-                if price_df.empty:
-                    raise Exception("Empty price data")
+def _settle(ticker: str, ready: Dict, futures: Dict, flight_key: Tuple, cache, cache_key):
+    """
+    Value from the cache / batch, else from its in-flight fetch. A failed fetch is
+    recorded in the negative cache and the last known (stale) value is served instead.
+    """
+    if ticker in ready:
+        return ready[ticker]
+    if ticker in futures:
+        try:
+            return futures[ticker].result(timeout=SETTLE_TIMEOUT_SECONDS)
+        except FutureTimeout:
+            print(f"⚠️ {flight_key} still in flight after {SETTLE_TIMEOUT_SECONDS:.0f}s, serving last known value")
+        except Exception as e:
+            print(f"⚠️ {flight_key} failed, serving last known value: {e}")
+            FAILURE_CACHE.put(flight_key, str(e))
+    return cache.get_stale(cache_key)
+
 
-                # Info data with retry
-                info_dict = load_info_data(ticker)
+def load_etfs_full_history(tickers: List[str], interval="1d", max_retries=3) -> Dict[str, Dict[str, Any]]:
+    """
+    Bulletproof loader assembled from per-ticker cache entries. Only the missing
+    symbols are fetched, and symbols another session is already fetching are awaited
+    instead of re-requested: one batched price download, then info lookups and
+    per-ticker price retries (only for symbols the batch missed) run concurrently on
+    the shared fetch executor. Always loads the full ("max") history.
+    """
+    tickers = canonical_tickers(tickers)
+    executor = get_executor()
+    retries = max_retries - 1
 
-                results[ticker] = {"prices": price_df, "info": info_dict}
-                break  # Success!
+    cached_prices, missing_prices = PRICE_CACHE.get_many([(t, interval) for t in tickers])
+    prices = {t: df for (t, _), df in cached_prices.items()}
+    # Symbols that failed within NEGATIVE_CACHE_TTL go straight to their stale value
+    to_fetch = [(t, i) for t, i in missing_prices if FAILURE_CACHE.get(("prices", t, i)) is None]
 
+    owned, waiting = FLIGHTS.claim([("prices", t, i) for t, i in to_fetch])
+    price_futures = {key[1]: future for key, future in waiting.items()}
+    owned_tickers = [key[1] for key in owned]
+
+    handed_off = set()  # owned keys already resolved or tied to a future
+    try:
+        if owned_tickers:
+            print(f"📥 Batch downloading {len(owned_tickers)} of {len(tickers)} tickers")
+            try:
+                batch_prices = load_price_histories(owned_tickers, "max", interval)
             except Exception as e:
-                print(f"⚠️ Attempt {attempt + 1} failed for {ticker}: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)  # Exponential backoff: 1s, 2s, 4s
-                else:
-                    # Fallback: empty but valid structure
-                    print(f"❌ {ticker} FAILED - using fallback")
-                    results[ticker] = {
-                        "prices": pd.DataFrame(),
-                        "info": {"quoteType": "unknown"}
-                    }
+                print(f"⚠️ Batched download failed: {e}")
+                batch_prices = {}
+            for ticker in owned_tickers:
+                key = ("prices", ticker, interval)
+                price_df = batch_prices.get(ticker)
+                try:
+                    if price_df is None or price_df.empty:
+                        raise ValueError("not in the batch")
+                    prices[ticker] = _cache_prices(ticker, interval, price_df)
+                    FLIGHTS.resolve(key, prices[ticker])
+                except Exception as e:
+                    if price_df is not None:
+                        print(f"⚠️ Batch data for {ticker} unusable, retrying individually: {e}")
+                    price_futures[ticker] = executor.submit(_load_and_cache_prices, ticker, interval, retries=retries)
+                    FLIGHTS.settle(key, price_futures[ticker])
+                handed_off.add(key)
+
+        infos, missing_info = INFO_CACHE.get_many(tickers)
+        missing_info = [t for t in missing_info if FAILURE_CACHE.get(("info", t)) is None]
+        owned_info, waiting_info = FLIGHTS.claim([("info", t) for t in missing_info])
+        owned = owned + owned_info
+        info_futures = {key[1]: future for key, future in waiting_info.items()}
+        for key in owned_info:
+            info_futures[key[1]] = executor.submit(_load_and_cache_info, key[1], retries=retries)
+            FLIGHTS.settle(key, info_futures[key[1]])
+            handed_off.add(key)
+    finally:
+        # Never leave a claimed key pending: other sessions would wait on it forever
+        for key in owned:
+            if key not in handed_off:
+                FLIGHTS.fail(key, RuntimeError(f"{key} was not fetched"))
+
+    results = {}
+    for ticker in tickers:
+        series = _settle(ticker, prices, price_futures, ("prices", ticker, interval), PRICE_CACHE, (ticker, interval))
+        info_dict = _settle(ticker, infos, info_futures, ("info", ticker), INFO_CACHE, ticker)
+        if series is None:
+            print(f"❌ {ticker} FAILED - using fallback")
+        # Fallback: empty but valid structure (never written to the per-ticker caches)
+        results[ticker] = {
+            "prices": series if series is not None else PriceSeries.from_frame(pd.DataFrame(), name=ticker),
+            "info": info_dict if info_dict is not None else {"quoteType": "unknown"}
+        }
 
     return results
+
+
+def load_price_series(tickers: List[str], period="max", interval="1d", max_retries=3) -> Dict[str, PriceSeries]:
+    """Compact Adj Close series per ticker (period slices of the cached full history)."""
+    full = load_etfs_full_history(tickers, interval, max_retries)
+    return {ticker: data["prices"].slice_period(period) for ticker, data in full.items()}
+
+
+def load_etfs(tickers: List[str], period="max", interval="1d", max_retries=3) -> Dict[str, Dict[str, Any]]:
+    """
+    Every period is a zero-copy date slice of one cached full-history series per ticker,
+    so switching the period never triggers a download. "prices" is a one-column
+    Adj Close frame built on top of the cached arrays.
+    """
+    full = load_etfs_full_history(tickers, interval, max_retries)
+    return {
+        ticker: {"prices": data["prices"].slice_period(period).to_frame(), "info": data["info"]}
+        for ticker, data in full.items()
+    }
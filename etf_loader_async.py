@@ -0,0 +1,265 @@
+"""
+etf_loader_async.py
+asyncio loader: one pooled keep-alive curl_cffi session, price and info requests
+overlapped across tickers. Results go through the same per-ticker caches and in-flight
+registry as etf_loader. `load_etfs_sync` is the blocking wrapper for Streamlit pages.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Dict, List
+
+import pandas as pd
+import yfinance as yf
+from curl_cffi import requests as curl_requests
+
+import price_store
+import streaming_state  # noqa: F401 - keeps the streaming accumulators in step with the store
+from etf_loader import SETTLE_TIMEOUT_SECONDS, _cache_prices
+from fetch_executor import UpstreamUnavailable, athrottle
+from fundamentals import RAW_INFO
+from market_cache import FAILURE_CACHE, INFO_CACHE, PRICE_CACHE, canonical_tickers
+from price_series import PriceSeries
+from single_flight import FLIGHTS
+
+CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart/{ticker}"
+IMPERSONATE = "chrome"
+MAX_CONNECTIONS = 16
+
+_loop = None
+_async_session = None
+_sync_session = None
+_lock = threading.Lock()
+
+
+# --------------------------
+# Shared loop + sessions
+# --------------------------
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """A single background event loop so the pooled session outlives each Streamlit rerun."""
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="etf-loader-async", daemon=True).start()
+        return _loop
+
+
+def get_async_session() -> curl_requests.AsyncSession:
+    global _async_session
+    if _async_session is None:
+        _async_session = curl_requests.AsyncSession(impersonate=IMPERSONATE, max_clients=MAX_CONNECTIONS)
+    return _async_session
+
+
+def get_sync_session() -> curl_requests.Session:
+    """Keep-alive session handed to yfinance for endpoints that need its cookie/crumb handling."""
+    global _sync_session
+    with _lock:
+        if _sync_session is None:
+            _sync_session = curl_requests.Session(impersonate=IMPERSONATE)
+        return _sync_session
+
+
+# --------------------------
+# Chart parsing
+# --------------------------
+
+def is_intraday(interval: str) -> bool:
+    return interval[-1] in ("m", "h")  # "1m".."90m", "1h" (not "1mo" / "3mo")
+
+
+def parse_chart(payload: Dict[str, Any], interval: str = "1d") -> pd.DataFrame:
+    """
+    Turn a v8 chart response into the same OHLCV + Adj Close frame yf.download returns:
+    exchange-local, tz-naive timestamps; daily and longer bars are dated at midnight.
+    """
+    chart = payload.get("chart", {})
+    if chart.get("error"):
+        raise ValueError(chart["error"].get("description", "chart error"))
+    result = (chart.get("result") or [None])[0]
+    if not result or not result.get("timestamp"):
+        return pd.DataFrame()
+
+    quote = result["indicators"]["quote"][0]
+    adjclose = result["indicators"].get("adjclose", [{}])[0].get("adjclose", quote["close"])
+    tz = result.get("meta", {}).get("exchangeTimezoneName", "UTC")
+
+    index = pd.to_datetime(result["timestamp"], unit="s", utc=True).tz_convert(tz).tz_localize(None)
+    if not is_intraday(interval):
+        index = index.normalize()
+    df = pd.DataFrame({
+        "Adj Close": adjclose,
+        "Close": quote["close"],
+        "High": quote["high"],
+        "Low": quote["low"],
+        "Open": quote["open"],
+        "Volume": quote["volume"],
+    }, index=pd.DatetimeIndex(index, name="Date"), dtype="float64")
+    df = df[~df.index.duplicated(keep="last")]
+    return df.dropna(how="all")
+
+
+# --------------------------
+# Async fetchers
+# --------------------------
+
+async def fetch_chart(ticker: str, interval: str = "1d", period: str = "max", start: pd.Timestamp = None) -> pd.DataFrame:
+    params = {"interval": interval, "includeAdjustedClose": "true", "events": "div,splits"}
+    if start is None:
+        params["range"] = period
+    else:
+        params["period1"] = int(pd.Timestamp(start).timestamp())
+        params["period2"] = int(pd.Timestamp.now().timestamp())
+
+    async with athrottle():
+        response = await get_async_session().get(CHART_URL.format(ticker=ticker), params=params)
+        response.raise_for_status()  # 429/5xx count against the breaker
+    return parse_chart(response.json(), interval)
+
+
+async def load_price_history_async(ticker: str, period: str = "max", interval: str = "1d") -> pd.DataFrame:
+    """Async twin of etf_loader.load_price_history: store first, only new bars upstream."""
+    if not price_store.is_storable(interval):
+        return await fetch_chart(ticker, interval, period=period)
+
+    stored = await asyncio.to_thread(price_store.read_prices, ticker, interval)
+    if stored.empty:
+        new_bars = await fetch_chart(ticker, interval, period="max")
+    elif price_store.needs_refresh(ticker, interval):
+        try:
+            new_bars = await fetch_chart(ticker, interval, start=price_store.refresh_start(stored))
+            if price_store.is_revised(stored, new_bars):
+                full = await fetch_chart(ticker, interval, period="max")
+                full = await asyncio.to_thread(price_store.replace_prices, ticker, interval, full)
+                return price_store.slice_period(full, period)
+        except Exception as e:
+            print(f"⚠️ Incremental refresh failed for {ticker}, serving stored history: {e}")
+            return price_store.slice_period(stored, period)
+    else:
+        return price_store.slice_period(stored, period)
+
+    full = await asyncio.to_thread(price_store.append_prices, ticker, interval, stored, new_bars)
+    return price_store.slice_period(full, period)
+
+
+def _fetch_info(ticker: str) -> Dict[str, Any]:
+    return yf.Ticker(ticker, session=get_sync_session()).info or {}
+
+
+async def load_info_async(ticker: str) -> Dict[str, Any]:
+    async with athrottle():
+        return await asyncio.to_thread(_fetch_info, ticker)
+
+
+async def _cached(flight_key, cache, cache_key, fetch, max_retries: int):
+    """
+    etf_loader's cache discipline for one key: fresh cache entry, else a negative-cache
+    short cut, else one shared in-flight fetch (FLIGHTS, also awaited across threads).
+    A failed fetch is recorded in FAILURE_CACHE and the last known (stale) value served.
+    """
+    value = cache.get(cache_key)
+    if value is not None or FAILURE_CACHE.get(flight_key) is not None:
+        return value if value is not None else cache.get_stale(cache_key)
+
+    owned, waiting = FLIGHTS.claim([flight_key])
+    if waiting:
+        # Only the owner resolves / fails the key (it may already belong to a newer fetch);
+        # shield keeps a timeout here from cancelling the owner's future
+        try:
+            shared = asyncio.shield(asyncio.wrap_future(waiting[flight_key]))
+            return await asyncio.wait_for(shared, SETTLE_TIMEOUT_SECONDS)
+        except Exception as e:
+            print(f"⚠️ {flight_key} failed or timed out in another session, serving last known value: {e!r}")
+            return cache.get_stale(cache_key)
+
+    try:
+        for attempt in range(max_retries):
+            try:
+                value = await fetch()
+                break
+            except Exception as e:
+                print(f"⚠️ Attempt {attempt + 1} failed for {flight_key}: {e}")
+                if isinstance(e, UpstreamUnavailable) or attempt == max_retries - 1:
+                    raise  # Breaker is open: fail fast instead of backing off
+                await asyncio.sleep(2 ** attempt)  # Only this ticker's task waits
+        FLIGHTS.resolve(flight_key, value)
+        return value
+    except Exception as e:
+        FLIGHTS.fail(flight_key, e)
+        FAILURE_CACHE.put(flight_key, str(e))
+        return cache.get_stale(cache_key)
+
+
+async def _load_ticker(ticker: str, period: str, interval: str, max_retries: int) -> Dict[str, Any]:
+    async def fetch_prices():
+        price_df = await load_price_history_async(ticker, "max", interval)
+        return _cache_prices(ticker, interval, price_df)  # raises on empty data
+
+    async def fetch_info():
+        info_dict = await load_info_async(ticker)
+        INFO_CACHE.put(ticker, info_dict)
+        RAW_INFO.put(ticker, info_dict)
+        return info_dict
+
+    # Price and info requests for the same ticker overlap as well
+    series, info_dict = await asyncio.gather(
+        _cached(("prices", ticker, interval), PRICE_CACHE, (ticker, interval), fetch_prices, max_retries),
+        _cached(("info", ticker), INFO_CACHE, ticker, fetch_info, max_retries),
+    )
+    if series is None:
+        print(f"❌ {ticker} FAILED - using fallback")
+        series = PriceSeries.from_frame(pd.DataFrame(), name=ticker)
+    return {
+        "prices": series.slice_period(period).to_frame(),
+        "info": info_dict if info_dict is not None else {"quoteType": "unknown"},
+    }
+
+
+async def load_etfs_async(tickers: List[str], period="max", interval="1d", max_retries=3) -> Dict[str, Dict[str, Any]]:
+    """
+    Same contract as etf_loader.load_etfs: canonical ticker keys, one-column Adj Close
+    frames sliced from the shared full-history PRICE_CACHE entry, INFO_CACHE info, and
+    the same FLIGHTS / FAILURE_CACHE keys, so sync and async callers share fetches and
+    cache entries. Every missing ticker is loaded concurrently on the event loop.
+    """
+    tickers = canonical_tickers(tickers)
+    loaded = await asyncio.gather(*(_load_ticker(t, period, interval, max_retries) for t in tickers))
+    return dict(zip(tickers, loaded))
+
+
+# --------------------------
+# Sync wrapper
+# --------------------------
+
+def _last_known(tickers: List[str], period: str, interval: str) -> Dict[str, Dict[str, Any]]:
+    """Stale cache entries (or the empty fallback) in load_etfs_async's shape."""
+    results = {}
+    for ticker in canonical_tickers(tickers):
+        series = PRICE_CACHE.get_stale((ticker, interval))
+        if series is None:
+            series = PriceSeries.from_frame(pd.DataFrame(), name=ticker)
+        info_dict = INFO_CACHE.get_stale(ticker)
+        results[ticker] = {
+            "prices": series.slice_period(period).to_frame(),
+            "info": info_dict if info_dict is not None else {"quoteType": "unknown"},
+        }
+    return results
+
+
+def load_etfs_sync(tickers: List[str], period="max", interval="1d", max_retries=3) -> Dict[str, Dict[str, Any]]:
+    """
+    Blocking entry point for Streamlit pages; runs on the shared background loop.
+    Waits at most SETTLE_TIMEOUT_SECONDS (as etf_loader), then serves the last known
+    values; the load keeps running on the loop and fills the caches for the next call.
+    """
+    future = asyncio.run_coroutine_threadsafe(
+        load_etfs_async(list(tickers), period, interval, max_retries), _get_loop()
+    )
+    try:
+        return future.result(timeout=SETTLE_TIMEOUT_SECONDS)
+    except FutureTimeout:
+        print(f"⚠️ Async load still running after {SETTLE_TIMEOUT_SECONDS:.0f}s, serving last known values")
+        return _last_known(list(tickers), period, interval)
@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, Any
+import price_panel
+from price_series import PriceSeries
 
 
 # --------------------------
@@ -11,6 +13,8 @@ def clean_prices(prices: pd.Series) -> pd.Series:
     """
     Ensure prices are a Series and drop NaNs
     """
+    if isinstance(prices, PriceSeries):
+        return prices.to_series()  # already NaN-free
     if isinstance(prices, pd.DataFrame):
         prices = prices.squeeze()
     return prices.dropna()
@@ -83,38 +87,44 @@ def compute_sentiment(info: Dict[str, Any]) -> float:
 # Main Factor Computation
 # --------------------------
 
+def _usable(etf_data: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    usable = {}
+    for ticker, data in etf_data.items():
+        prices = data["prices"]
+        if not isinstance(prices, PriceSeries) and "Adj Close" not in prices:
+            print(f"⚠️ Missing 'Adj Close' for {ticker}, skipping")
+            continue
+        usable[ticker] = data
+    return usable
+
+
 def compute_factors(etf_data: Dict[str, Dict[str, Any]]) -> pd.DataFrame:
     """
     Compute all factors and prepare DataFrame for CSV/table export.
+    Per ticker, from the registry's "v1" set (factor_registry.compute_factor_table).
     Returns:
         DataFrame: one row per ETF, columns = factors + ticker
     """
-    factor_rows = []
+    from factor_registry import compute_factor_table  # factor_registry builds on this module
 
-    for ticker, data in etf_data.items():
-        try:
-            prices = data["prices"]["Adj Close"]
-        except KeyError:
-            print(f"⚠️ Missing 'Adj Close' for {ticker}, skipping")
-            continue
+    return compute_factor_table(_usable(etf_data), "v1")
 
-        row = {
-            "Ticker": ticker,
-            "Momentum": compute_momentum(prices),
-            "Growth": compute_growth(prices),
-            "Value": compute_value(data["info"]),
-            "Volatility": compute_volatility(prices),  # only volatility
-            "MaxDrawdown": compute_max_drawdown(prices),
-            "Sentiment": compute_sentiment(data["info"])
-        }
 
-        factor_rows.append(row)
+def compute_factors_panel(etf_data: Dict[str, Dict[str, Any]]) -> pd.DataFrame:
+    """
+    Same output as compute_factors, with Momentum/Growth/Volatility/MaxDrawdown for
+    every ticker computed at once on a NumPy price panel (see price_panel).
+    """
+    from factor_registry import FACTOR_SETS  # factor_registry builds on this module
 
-    df = pd.DataFrame(factor_rows)
+    usable = _usable(etf_data)
+    panel = price_panel.price_factors({t: d["prices"] for t, d in usable.items()}, schema="v1")
+    df = panel.reset_index()
+    df["Value"] = [compute_value(d["info"]) for d in usable.values()]
+    df["Sentiment"] = [float(compute_sentiment(d["info"])) for d in usable.values()]
 
-    # Optional: sort by Ticker
+    df = df[["Ticker", *FACTOR_SETS["v1"]]]
     df = df.sort_values(by="Ticker").reset_index(drop=True)
-
     return df
 
 
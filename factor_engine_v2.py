@@ -1,13 +1,18 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List
-import streamlit as st
-import yfinance as yf
-import time
+from typing import Dict, Any
+import fundamentals
+import holdings_store
+import parallel_screen
+import price_panel
+from etf_loader import load_info_data
+from price_series import PriceSeries
 
 
 # -------------------------- Helper Functions --------------------------
 def clean_prices(prices: pd.Series) -> pd.Series:
+    if isinstance(prices, PriceSeries):
+        return prices.to_series()  # already NaN-free
     if isinstance(prices, pd.DataFrame):
         prices = prices.squeeze()
     return prices.dropna()
@@ -26,24 +31,15 @@ def safe_scalar(x):
 
 # -------------------------- Cached yfinance calls ---------------------
 def get_cached_holdings(ticker: str) -> pd.DataFrame:
-    """Cached ETF holdings - called ONCE per ticker lifetime."""
-    time.sleep(0.2)  # Conservative rate limiting
-    try:
-        t = yf.Ticker(ticker)
-        holdings = t.fund_holdings
-        if holdings is None or holdings.empty:
-            return pd.DataFrame()
-        return holdings
-    except:
-        return pd.DataFrame()
+    """ETF top holdings (Symbol, Weight) from the local holdings store."""
+    return holdings_store.load_holdings([ticker])[ticker.upper()]
 
 
 def get_cached_stock_info(ticker: str) -> Dict[str, Any]:
-    """Cached individual stock info."""
-    time.sleep(0.1)
+    """Individual stock info from the shared info cache."""
     try:
-        return yf.Ticker(ticker).info
-    except:
+        return load_info_data(ticker)
+    except Exception:
         return {}
 
 
@@ -104,42 +100,16 @@ def compute_volatility(prices: pd.Series) -> float:
     return float(returns.std() * np.sqrt(252))
 
 
-# -------------------------- FIXED ETF Quality (DISABLED BY DEFAULT) ------------------
+# -------------------------- ETF Quality (holdings look-through) ------------------
 def compute_etf_quality(ticker: str, _use_holdings=True) -> float:
-    """DISABLED holdings analysis by default to avoid rate limits."""
-    if _use_holdings:  # Only enable for small # tickers
-        try:
-            holdings = get_cached_holdings(ticker)
-            if holdings.empty:
-                return np.nan
-
-            holdings = holdings[holdings['Holding'] != "Total"]
-            holdings['Weight'] = holdings['Weight'].str.rstrip('%').astype(float)
-            holdings = holdings.sort_values('Weight', ascending=False)
-            holdings['CumWeight'] = holdings['Weight'].cumsum()
-
-            top_holdings = holdings[holdings['CumWeight'] <= 70]
-            if top_holdings.empty:
-                top_holdings = holdings.iloc[:1]
-
-            quality_list = []
-            weight_list = []
-            for _, row in top_holdings.iterrows():
-                stock_ticker = row['Symbol']
-                stock_weight = row['Weight'] / 100
-                stock_info = get_cached_stock_info(stock_ticker)
-                q = compute_quality(stock_info)
-                if not np.isnan(q):
-                    quality_list.append(q)
-                    weight_list.append(stock_weight)
-
-            if not quality_list:
-                return np.nan
-            return np.average(quality_list, weights=weight_list)
-        except Exception as e:
-            print(f"⚠️ ETF Quality skipped for {ticker}: {e}")
-            return np.nan
-    return np.nan  # Skip expensive holdings analysis
+    """Weighted quality of the ETF's top holdings; use holdings_store.etf_quality for many ETFs."""
+    if not _use_holdings:
+        return np.nan
+    try:
+        return float(holdings_store.etf_quality([ticker]).iloc[0])
+    except Exception as e:
+        print(f"⚠️ ETF Quality skipped for {ticker}: {e}")
+        return np.nan
 
 
 def compute_cost(info: Dict[str, Any]) -> float:
@@ -157,33 +127,78 @@ def compute_cost(info: Dict[str, Any]) -> float:
 
 
 # -------------------------- Main Factor Computation -------------------
-def compute_factors(etf_data: Dict[str, Dict[str, Any]], period: str = "5y") -> pd.DataFrame:
-    factor_rows = []
-    for ticker, data in etf_data.items():
-        prices = data.get("prices", {}).get("Adj Close", pd.Series())
-        info = data.get("info", {})
-        quote_type = info.get("quoteType", "").lower()
-
-        row = {
-            "Ticker": ticker,
-            "Momentum": safe_scalar(compute_momentum(prices, period=period)),
-            "Value": safe_scalar(compute_value(info)),
-            "Volatility": safe_scalar(compute_volatility(prices)),
-            "Growth": safe_scalar(compute_growth(info)),
-            "Size": safe_scalar(compute_size(info)),
-            "Cost": safe_scalar(compute_cost(info)),
-            "info": info
-        }
-
-        if quote_type == "etf":
-            row["Quality"] = np.nan  # DISABLED - too expensive
-            row["Growth"] = np.nan
-        else:
-            row["Quality"] = safe_scalar(compute_quality(info))
-            row["Cost"] = np.nan
-
-        factor_rows.append(row)
-
-    df = pd.DataFrame(factor_rows)
-    df = df.sort_values("Ticker").reset_index(drop=True)
-    return df
+def _etf_quality_values(etf_data: Dict[str, Dict[str, Any]], etf_quality: bool) -> pd.Series:
+    """ETF Quality for every ETF in one batched holdings / constituent pass."""
+    etf_tickers = [t for t, d in etf_data.items() if d.get("info", {}).get("quoteType", "").lower() == "etf"]
+    if etf_quality and etf_tickers:
+        try:
+            return holdings_store.etf_quality(etf_tickers)
+        except Exception as e:
+            print(f"⚠️ ETF Quality skipped: {e}")
+    return pd.Series(dtype="float64")
+
+
+def info_factors(table: pd.DataFrame, etf_quality_values: pd.Series) -> pd.DataFrame:
+    """
+    Value / Growth / Size / Cost / Quality for every ticker at once from the typed
+    fundamentals table (same rules as compute_value, compute_growth, ... per row).
+    ETFs get holdings-based Quality and no Growth; stocks get no Cost.
+    One deliberate difference: the table stores an unusable priceToBook (NaN, inf,
+    "Infinity") as missing, so Value falls back to 1 / trailingPE where compute_value
+    returned NaN (or raised, for strings).
+    """
+    is_etf = (table["quoteType"] == "ETF").to_numpy()
+    pb = table["priceToBook"].where(table["priceToBook"] != 0)
+    pe = table["trailingPE"].where(table["trailingPE"] != 0)
+    expense = table[["netExpenseRatio", "expenseRatio", "managementExpenseRatio", "totalExpenseRatio"]]
+    expense = expense.where(expense > 0)
+
+    return pd.DataFrame({
+        "Value": (1 / pb).fillna(1 / pe),
+        "Growth": fundamentals.first_valid(table, ["earningsQuarterlyGrowth", "revenueGrowth", "revenueGrowthQuarterlyYOY"]).where(~is_etf),
+        "Size": table["marketCap"],
+        "Cost": (1.0 / (fundamentals.first_valid(expense, expense.columns) + 0.001)).where(is_etf),
+        "Quality": fundamentals.first_valid(table, ["returnOnEquity", "returnOnAssets", "grossMargins"]).where(
+            ~is_etf, etf_quality_values.reindex(table.index.str.upper()).to_numpy()
+        ),
+    }, index=table.index, dtype="float64")
+
+
+def _assemble(etf_data: Dict[str, Dict[str, Any]], momentum, volatility, etf_quality: bool) -> pd.DataFrame:
+    """factor_df in the registry's v2 column order; raw info dicts stay in fundamentals.RAW_INFO."""
+    from factor_registry import FACTOR_SETS  # factor_registry builds on this module
+
+    table = fundamentals.from_etf_data(etf_data)
+    columns = info_factors(table, _etf_quality_values(etf_data, etf_quality))
+    columns["Momentum"] = np.asarray(momentum, dtype="float64")
+    columns["Volatility"] = np.asarray(volatility, dtype="float64")
+    df = columns[list(FACTOR_SETS["v2"])].reset_index(drop=True)
+    df.insert(0, "Ticker", list(etf_data))
+    return df.sort_values("Ticker").reset_index(drop=True)
+
+
+def compute_factors(etf_data: Dict[str, Dict[str, Any]], period: str = "5y", etf_quality: bool = True,
+                    processes: int = 1) -> pd.DataFrame:
+    """
+    Per-ticker factors from the registry's "v2" set (factor_registry.compute_factor_table).
+    processes > 1 (or None for automatic) switches to the chunked multi-process panel path.
+    """
+    if processes != 1:
+        return compute_factors_panel(etf_data, period, etf_quality, processes)
+    from factor_registry import compute_factor_table  # factor_registry builds on this module
+
+    return compute_factor_table(etf_data, "v2", period, etf_quality=etf_quality)
+
+
+def compute_factors_panel(etf_data: Dict[str, Dict[str, Any]], period: str = "5y", etf_quality: bool = True,
+                          processes: int = None) -> pd.DataFrame:
+    """
+    Same factor_df as compute_factors; Momentum/Volatility for all tickers come from one
+    NumPy panel. Large universes are split across processes (parallel_screen).
+    """
+    prices = {t: d.get("prices") for t, d in etf_data.items()}
+    if parallel_screen.use_parallel(len(prices), processes):
+        panel = parallel_screen.price_factors(prices, period, schema="v2", processes=processes)
+    else:
+        panel = price_panel.price_factors(prices, period, schema="v2")
+    return _assemble(etf_data, panel["Momentum"].to_numpy(), panel["Volatility"].to_numpy(), etf_quality)
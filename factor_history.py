@@ -0,0 +1,199 @@
+"""
+factor_history.py
+Price factors as of every date: one dates x tickers frame per factor, built in a
+single pass with shifted arrays, prefix sums and running peaks instead of
+re-running the factor engines once per historical date.
+Results can be stored as Parquet (one file per factor) for the screener and charts.
+"""
+
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+import price_panel
+
+FACTOR_DIR = Path(os.environ.get("FACTOR_STORE_DIR", "data/factors"))
+
+# Bars per history window; None means everything loaded
+PERIOD_BARS = {"1y": 252, "2y": 504, "5y": 1260, "10y": 2520, "max": None}
+
+FACTORS = ["Momentum", "Growth", "Volatility", "MaxDrawdown"]
+
+
+# --------------------------
+# Bar-position helpers
+# --------------------------
+
+def _to_bars(prices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Justify each column's valid prices to the bottom so "n bars back" is a fixed row
+    offset, as in price_panel. Returns (justified, order) - `order` maps results back.
+    """
+    order = np.argsort(~np.isnan(prices), axis=0, kind="stable")
+    return np.take_along_axis(prices, order, axis=0), order
+
+
+def _to_dates(values: np.ndarray, order: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    out = np.empty_like(values)
+    np.put_along_axis(out, order, values, axis=0)
+    out[~valid] = np.nan  # no factor value on dates the ticker did not trade
+    return out
+
+
+def _shift(a: np.ndarray, k: int) -> np.ndarray:
+    """Row t holds a[t - k]; the first k rows are NaN."""
+    if k <= 0:
+        return a
+    out = np.full_like(a, np.nan)
+    if k < len(a):
+        out[k:] = a[:-k]
+    return out
+
+
+def _window_sum(values: np.ndarray, window: int = None) -> np.ndarray:
+    """Trailing sum over `window` rows (expanding if None) from one prefix sum; NaNs count as 0."""
+    prefix = np.cumsum(np.nan_to_num(values), axis=0)
+    if window is None:
+        return prefix
+    return prefix - np.nan_to_num(_shift(prefix, window))
+
+
+# --------------------------
+# Factor histories (justified bars)
+# --------------------------
+
+def return_history(bars: np.ndarray, start_back: int, end_back: int = 1) -> np.ndarray:
+    """As of every bar: prices.iloc[-end_back] / prices.iloc[-start_back] - 1."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return _shift(bars, end_back - 1) / _shift(bars, start_back - 1) - 1
+
+
+def volatility_history(bars: np.ndarray, window: int = None,
+                       periods_per_year: int = price_panel.TRADING_DAYS) -> np.ndarray:
+    """
+    Annualized std (ddof=1) of the simple returns inside the trailing `window` bars,
+    from prefix sums of returns and squared returns (demeaned per column first to
+    keep the subtraction well conditioned).
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = bars / _shift(bars, 1) - 1
+        returns = returns - np.nanmean(returns, axis=0)
+        n_window = None if window is None else window - 1  # W bars hold W - 1 returns
+        n = _window_sum(~np.isnan(returns) * 1.0, n_window)
+        s1 = _window_sum(returns, n_window)
+        s2 = _window_sum(returns ** 2, n_window)
+        var = (s2 - s1 ** 2 / n) / (n - 1)
+    return np.where(n >= 2, np.sqrt(np.maximum(var, 0)) * np.sqrt(periods_per_year), np.nan)
+
+
+def max_drawdown_history(bars: np.ndarray, window: int = None) -> np.ndarray:
+    """
+    Worst drawdown inside the trailing `window` bars (expanding if None) as of every bar,
+    i.e. factor_engine.compute_max_drawdown on that window. Drawdowns combine over
+    consecutive segments from (peak, trough, drawdown), so each window is split at a
+    multiple of `window` into the suffix of one block and the prefix of the next, both
+    running scans (van Herk / Gil-Werman).
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if window is None:
+            peak = np.fmax.accumulate(bars, axis=0)
+            return np.fmin.accumulate(bars / peak - 1, axis=0)
+
+        n, m = bars.shape
+        n_blocks = -(-n // window)
+        blocks = np.full((n_blocks * window, m), np.nan)
+        blocks[:n] = bars
+        blocks = blocks.reshape(n_blocks, window, m)
+
+        # prefix of each block up to the bar: running peak, trough and drawdown
+        pre_min = np.fmin.accumulate(blocks, axis=1).reshape(-1, m)[:n]
+        pre_dd = np.fmin.accumulate(blocks / np.fmax.accumulate(blocks, axis=1) - 1, axis=1).reshape(-1, m)[:n]
+        # suffix of each block from the bar on: peak, and the deepest fall below each bar
+        reverse = blocks[:, ::-1]
+        suf_max = np.fmax.accumulate(reverse, axis=1)[:, ::-1].reshape(-1, m)
+        suf_min = np.fmin.accumulate(reverse, axis=1)[:, ::-1]
+        suf_dd = np.fmin.accumulate((suf_min / blocks - 1)[:, ::-1], axis=1)[:, ::-1].reshape(-1, m)
+
+        out = pre_dd.copy()  # windows that start on a block boundary (or before bar 0)
+        t = np.arange(n)
+        t = t[(t >= window) & ((t + 1) % window != 0)]
+        s = t - window + 1
+        out[t] = np.fmin(np.fmin(suf_dd[s], pre_dd[t]), pre_min[t] / suf_max[s] - 1)
+    return out
+
+
+# --------------------------
+# Build / query
+# --------------------------
+
+def compute_factor_history(prices: Dict[str, Any], period: str = "5y", schema: str = "v2") -> Dict[str, pd.DataFrame]:
+    """
+    {factor: dates x tickers} for FACTORS, where each value is what the factor engine
+    would return for the `period` window (PERIOD_BARS trading bars) ending on that date.
+    Momentum follows factor_engine_v2 (schema="v2") or factor_engine's 12-1 (schema="v1").
+    """
+    aligned = price_panel.align_panel(prices)
+    if aligned.empty:
+        return {f: pd.DataFrame() for f in FACTORS}
+
+    matrix = aligned.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(matrix)
+    bars, order = _to_bars(matrix)
+    window = PERIOD_BARS.get(period.lower())
+
+    if schema == "v1":
+        momentum = return_history(bars, 12 * 21 + 21, end_back=21)
+    else:
+        momentum = return_history(bars, price_panel.momentum_lookback(period))
+    values = {
+        "Momentum": momentum,
+        "Growth": return_history(bars, price_panel.TRADING_DAYS),
+        "Volatility": volatility_history(bars, window),
+        "MaxDrawdown": max_drawdown_history(bars, window),
+    }
+    return {
+        name: pd.DataFrame(_to_dates(v, order, valid), index=aligned.index, columns=aligned.columns)
+        for name, v in values.items()
+    }
+
+
+def as_of(history: Dict[str, pd.DataFrame], date) -> pd.DataFrame:
+    """Ticker x factor cross-section from the last row on or before `date`."""
+    columns = {}
+    for name, frame in history.items():
+        rows = frame.loc[:pd.Timestamp(date)].ffill()
+        columns[name] = rows.iloc[-1] if not rows.empty else pd.Series(np.nan, index=frame.columns)
+    df = pd.DataFrame(columns)
+    df.index.name = "Ticker"
+    return df
+
+
+# --------------------------
+# Store
+# --------------------------
+
+def history_dir(name: str) -> Path:
+    return FACTOR_DIR / name
+
+
+def save_factor_history(history: Dict[str, pd.DataFrame], name: str) -> None:
+    """Replace the stored set `name` atomically (written to a temp dir, then renamed)."""
+    target = history_dir(name)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    tmp.mkdir(parents=True, exist_ok=True)
+    for factor, frame in history.items():
+        frame.to_parquet(tmp / f"{factor}.parquet")
+    if target.exists():
+        shutil.rmtree(target)
+    os.replace(tmp, target)
+
+
+def load_factor_history(name: str) -> Dict[str, pd.DataFrame]:
+    target = history_dir(name)
+    if not target.exists():
+        return {}
+    return {path.stem: pd.read_parquet(path) for path in sorted(target.glob("*.parquet"))}
@@ -0,0 +1,280 @@
+"""
+factor_registry.py
+Declarative factor registry. Every factor names the intermediates it needs (cleaned
+prices, returns, drawdown curve, info, ...); intermediates can depend on
+each other and are computed at most once per ticker, and only for the factors asked
+for. The v1 (factor_engine) and v2 (factor_engine_v2) factor sets share intermediates,
+so both can be produced in one pass; both engines' per-ticker compute_factors are
+compute_factor_table with their set.
+
+    @register_factor("sharpe_like", needs=("returns",))
+    def sharpe_like(returns):
+        return returns.mean() / returns.std()
+"""
+
+import inspect
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+import factor_engine
+import factor_engine_v2
+
+
+class Node(NamedTuple):
+    name: str
+    fn: Callable
+    needs: Tuple[str, ...]
+
+
+INTERMEDIATES: Dict[str, Node] = {}
+FACTORS: Dict[str, Node] = {}
+
+
+def _register(table: Dict[str, Node], name: str, needs: Iterable[str]):
+    def wrap(fn: Callable) -> Callable:
+        needs_ = tuple(needs)
+        missing = set(inspect.signature(fn).parameters) - set(needs_)
+        if missing:
+            raise ValueError(f"{name}: parameters {sorted(missing)} are not declared in needs")
+        table[name] = Node(name, fn, needs_)
+        return fn
+    return wrap
+
+
+def intermediate(name: str, needs: Iterable[str] = ()):
+    return _register(INTERMEDIATES, name, needs)
+
+
+def register_factor(name: str, needs: Iterable[str] = ()):
+    return _register(FACTORS, name, needs)
+
+
+# --------------------------
+# Evaluation context
+# --------------------------
+
+class FactorRun:
+    """State shared by every ticker of one evaluation (batch inputs such as ETF Quality)."""
+
+    def __init__(self, etf_data: Dict[str, Dict[str, Any]], period: str, use_etf_quality: bool = True):
+        self.etf_data = etf_data
+        self.period = period
+        self.use_etf_quality = use_etf_quality
+        self._etf_quality = None
+
+    @property
+    def etf_quality(self) -> pd.Series:
+        if self._etf_quality is None:
+            self._etf_quality = factor_engine_v2._etf_quality_values(self.etf_data, self.use_etf_quality)
+        return self._etf_quality
+
+
+class FactorContext:
+    """One ticker's inputs plus lazily computed, memoized intermediates."""
+
+    def __init__(self, ticker: str, data: Dict[str, Any], run: FactorRun):
+        self._values = {"ticker": ticker, "raw_prices": data.get("prices"),
+                        "info": data.get("info", {}) or {}, "period": run.period, "run": run}
+        self.computed = []  # intermediates evaluated, in order (one entry each)
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._values:
+            node = INTERMEDIATES.get(name)
+            if node is None:
+                raise KeyError(f"Unknown intermediate '{name}'")
+            self._values[name] = node.fn(**{n: self[n] for n in node.needs})
+            self.computed.append(name)
+        return self._values[name]
+
+    def evaluate(self, factor: str) -> float:
+        node = FACTORS[factor]
+        try:
+            return factor_engine_v2.safe_scalar(node.fn(**{n: self[n] for n in node.needs}))
+        except Exception as e:
+            print(f"⚠️ {factor} failed for {self['ticker']}: {e}")
+            return np.nan
+
+
+# --------------------------
+# Intermediates
+# --------------------------
+
+@intermediate("prices", needs=("raw_prices",))
+def _prices(raw_prices):
+    """Cleaned Adj Close series (shared by every price factor)."""
+    if raw_prices is None:
+        return pd.Series(dtype="float64")
+    if isinstance(raw_prices, pd.DataFrame):
+        if "Adj Close" not in raw_prices.columns:
+            return pd.Series(dtype="float64")
+        raw_prices = raw_prices["Adj Close"]
+    return factor_engine.clean_prices(raw_prices)
+
+
+@intermediate("returns", needs=("prices",))
+def _returns(prices):
+    return factor_engine.compute_returns(prices)
+
+
+@intermediate("drawdown", needs=("prices",))
+def _drawdown(prices):
+    """Drawdown curve of the rebased prices (as factor_engine.compute_max_drawdown)."""
+    if prices.empty:
+        return prices
+    cumulative = prices / prices.iloc[0]
+    peak = cumulative.cummax()
+    return (cumulative - peak) / peak
+
+
+@intermediate("is_etf", needs=("info",))
+def _is_etf(info):
+    return info.get("quoteType", "").lower() == "etf"
+
+
+@intermediate("etf_quality", needs=("ticker", "run"))
+def _etf_quality(ticker, run):
+    return run.etf_quality.get(ticker.upper(), np.nan)
+
+
+# --------------------------
+# Price factors
+# --------------------------
+
+def _trailing_return(prices: pd.Series, start_back: int, end_back: int = 1) -> float:
+    if len(prices) < start_back:
+        return np.nan
+    return prices.iloc[-end_back] / prices.iloc[-start_back] - 1
+
+
+@register_factor("momentum", needs=("prices", "period"))
+def momentum(prices, period):
+    """factor_engine_v2: 12 months (6 for a 1y window)."""
+    return _trailing_return(prices, 21 * (6 if period.lower() == "1y" else 12))
+
+
+@register_factor("momentum_12_1", needs=("prices",))
+def momentum_12_1(prices):
+    """factor_engine: 12 months, skipping the last month."""
+    return _trailing_return(prices, 21 * 12 + 21, end_back=21)
+
+
+@register_factor("price_growth", needs=("prices",))
+def price_growth(prices):
+    """factor_engine: 1-year price change."""
+    return _trailing_return(prices, 252)
+
+
+@register_factor("volatility", needs=("returns",))
+def volatility(returns):
+    return returns.std() * np.sqrt(252)
+
+
+@register_factor("max_drawdown", needs=("drawdown",))
+def max_drawdown(drawdown):
+    return drawdown.min()
+
+
+# --------------------------
+# Info factors
+# --------------------------
+
+@register_factor("value", needs=("info",))
+def value(info):
+    return factor_engine_v2.compute_value(info)
+
+
+@register_factor("growth", needs=("info", "is_etf"))
+def growth(info, is_etf):
+    return np.nan if is_etf else factor_engine_v2.compute_growth(info)
+
+
+@register_factor("size", needs=("info",))
+def size(info):
+    return factor_engine_v2.compute_size(info)
+
+
+@register_factor("cost", needs=("info", "is_etf"))
+def cost(info, is_etf):
+    return factor_engine_v2.compute_cost(info) if is_etf else np.nan
+
+
+@register_factor("quality", needs=("info", "is_etf", "etf_quality"))
+def quality(info, is_etf, etf_quality):
+    """Stocks: own profitability; ETFs: weighted quality of the top holdings."""
+    return etf_quality if is_etf else factor_engine_v2.compute_quality(info)
+
+
+@register_factor("sentiment", needs=("info",))
+def sentiment(info):
+    return factor_engine.compute_sentiment(info)
+
+
+# --------------------------
+# Factor sets (output column -> factor)
+# --------------------------
+
+FACTOR_SETS = {
+    "v1": {
+        "Momentum": "momentum_12_1",
+        "Growth": "price_growth",
+        "Value": "value",
+        "Volatility": "volatility",
+        "MaxDrawdown": "max_drawdown",
+        "Sentiment": "sentiment",
+    },
+    "v2": {
+        "Momentum": "momentum",
+        "Value": "value",
+        "Volatility": "volatility",
+        "Growth": "growth",
+        "Size": "size",
+        "Cost": "cost",
+        "Quality": "quality",
+    },
+}
+# Both engines in one pass; v1-only definitions get distinct column names
+FACTOR_SETS["all"] = {
+    **FACTOR_SETS["v2"],
+    "Momentum12_1": "momentum_12_1",
+    "PriceGrowth": "price_growth",
+    "MaxDrawdown": "max_drawdown",
+    "Sentiment": "sentiment",
+}
+
+
+def resolve_factors(factors: Union[str, Iterable[str], Dict[str, str]]) -> Dict[str, str]:
+    """Factor set name, list of factor names, or {column: factor} -> {column: factor}."""
+    if isinstance(factors, str):
+        columns = FACTOR_SETS[factors] if factors in FACTOR_SETS else {factors: factors}
+    elif isinstance(factors, dict):
+        columns = dict(factors)
+    else:
+        columns = {f: f for f in factors}
+    unknown = set(columns.values()) - set(FACTORS)
+    if unknown:
+        raise KeyError(f"Unknown factors: {sorted(unknown)}")
+    return columns
+
+
+def compute_factor_table(etf_data: Dict[str, Dict[str, Any]], factors="all", period: str = "5y",
+                         include_info: bool = False, etf_quality: bool = True) -> pd.DataFrame:
+    """
+    One row per ticker with the requested factors. Each intermediate is computed at
+    most once per ticker, and only if a requested factor (or intermediate) needs it.
+    etf_quality=False skips the holdings look-through (ETF Quality is NaN).
+    """
+    columns = resolve_factors(factors)
+    run = FactorRun(etf_data, period, etf_quality)
+    rows = []
+    for ticker, data in etf_data.items():
+        ctx = FactorContext(ticker, data, run)
+        row = {"Ticker": ticker}
+        row.update({column: ctx.evaluate(factor) for column, factor in columns.items()})
+        if include_info:
+            row["info"] = ctx["info"]
+        rows.append(row)
+
+    df = pd.DataFrame(rows, columns=["Ticker", *columns] + (["info"] if include_info else []))
+    return df.sort_values("Ticker").reset_index(drop=True)
@@ -0,0 +1,339 @@
+"""
+fetch_executor.py
+Process-wide fetch executor: a bounded thread pool, one shared token bucket and
+per-host concurrency limits. Every upstream call (prices, info, search, holdings)
+goes through `throttle()`; fan-out work goes through `get_executor().submit()`.
+"""
+
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+YAHOO_HOST = "query1.finance.yahoo.com"
+
+RATE_PER_SECOND = float(os.environ.get("FETCH_RATE_PER_SECOND", 4))
+BURST = int(os.environ.get("FETCH_BURST", 8))
+MAX_WORKERS = int(os.environ.get("FETCH_MAX_WORKERS", 8))
+HOST_LIMITS = {YAHOO_HOST: int(os.environ.get("FETCH_HOST_LIMIT", 4))}
+DEFAULT_HOST_LIMIT = 2
+
+# Symbols per multi-ticker download; each chunk is one throttled call on one connection
+BATCH_CHUNK_SIZE = int(os.environ.get("FETCH_BATCH_CHUNK", 20))
+
+# Consecutive failures before the breaker opens, and how long it stays open
+BREAKER_THRESHOLD = int(os.environ.get("FETCH_BREAKER_THRESHOLD", 5))
+BREAKER_COOLDOWN_SECONDS = float(os.environ.get("FETCH_BREAKER_COOLDOWN", 60))
+
+# Number of recent upstream requests kept for latency / success-rate reporting
+LATENCY_WINDOW = int(os.environ.get("FETCH_LATENCY_WINDOW", 500))
+
+
+# Error text of transport failures, rate limiting and 5xx responses, for clients that
+# report errors as messages instead of raising (yf.download logs per-symbol errors)
+OUTAGE_PATTERN = re.compile(
+    r"ConnectionError|Connection refused|Connection reset|Failed to perform|Timeout|timed out|"
+    r"SSLError|ProxyError|DNSError|Could not resolve host|RateLimit|Too Many Requests|"
+    r"\b(?:429|5\d\d) (?:Client |Server )?Error",
+    re.IGNORECASE,
+)
+
+
+class UpstreamUnavailable(Exception):
+    """Raised without touching the network while a host's circuit breaker is open."""
+
+
+class UpstreamError(Exception):
+    """A transport / 429 / 5xx failure a client reported as a message instead of raising."""
+
+
+def is_outage_message(message: str) -> bool:
+    return bool(OUTAGE_PATTERN.search(message or ""))
+
+
+def is_outage(error: BaseException) -> bool:
+    """
+    Whether an error raised inside throttle() says the host is struggling: transport
+    errors (connection, timeout, TLS - all OSError subclasses in requests / curl_cffi),
+    HTTP 429 / 5xx and yfinance's rate-limit error. Anything else (404, unknown symbol,
+    missing funds data, a parse error) means the host answered and is not counted.
+    """
+    if isinstance(error, UpstreamError):
+        return True
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, (OSError, TimeoutError)) or type(error).__name__ == "YFRateLimitError"
+
+
+# --------------------------
+# Token bucket
+# --------------------------
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, at most `capacity` banked."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, cost: float = 1.0) -> None:
+        """Costs above `capacity` are paid in capacity-sized installments, never capped."""
+        while cost > 0:
+            installment = min(cost, self.capacity)
+            self._take(installment)
+            cost -= installment
+
+    def _take(self, cost: float) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= cost:
+                    self._tokens -= cost
+                    return
+                wait = (cost - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# --------------------------
+# Circuit breaker
+# --------------------------
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures; while open every request fails
+    immediately. After `cooldown` seconds a single probe request is let through.
+    """
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN_SECONDS):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._probing and time.monotonic() - self._opened_at >= self.cooldown:
+                self._probing = True  # half-open
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+
+# --------------------------
+# Latency window
+# --------------------------
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..100); None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+class LatencyWindow:
+    """Rolling record of the last `size` requests: (finished at, seconds, succeeded)."""
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self._samples.append((time.time(), seconds, ok))
+
+    def samples(self) -> List[Tuple[float, float, bool]]:
+        with self._lock:
+            return list(self._samples)
+
+    def summary(self) -> Dict[str, Any]:
+        samples = self.samples()
+        latencies = [seconds for _, seconds, _ in samples]
+        return {
+            "count": len(samples),
+            "success_rate": sum(ok for _, _, ok in samples) / len(samples) if samples else None,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "last_at": samples[-1][0] if samples else None,
+        }
+
+
+# Every request made inside throttle()/athrottle(), timed after the rate-limit wait
+FETCH_LATENCY = LatencyWindow()
+
+_bucket = TokenBucket(RATE_PER_SECOND, BURST)
+_host_slots: Dict[str, threading.BoundedSemaphore] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+_host_lock = threading.Lock()
+
+
+def _host_slot(host: str) -> threading.BoundedSemaphore:
+    with _host_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(HOST_LIMITS.get(host, DEFAULT_HOST_LIMIT))
+        return _host_slots[host]
+
+
+def breaker(host: str = YAHOO_HOST) -> CircuitBreaker:
+    with _host_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker()
+        return _breakers[host]
+
+
+class Request:
+    """
+    Yielded by throttle() / athrottle(). A client that reports failures without raising
+    (yf.download) calls fail(error) so the request still counts as failed.
+    """
+
+    def __init__(self):
+        self.error = None
+
+    def fail(self, error: BaseException) -> None:
+        self.error = error
+
+
+def _record(host_breaker: CircuitBreaker, start: float, error: BaseException,
+            classify: Callable[[BaseException], bool]) -> None:
+    outage = error is not None and classify(error)
+    FETCH_LATENCY.record(time.perf_counter() - start, not outage)
+    if outage:
+        host_breaker.record_failure()
+    else:
+        host_breaker.record_success()  # the host answered
+
+
+@contextmanager
+def throttle(host: str = YAHOO_HOST, cost: float = 1.0, classify: Callable[[BaseException], bool] = is_outage):
+    """
+    Wrap a single upstream request: fails fast while the host's breaker is open,
+    otherwise waits for a host slot and a rate-limit token. Exceptions raised inside
+    the block (or passed to the yielded Request's fail()) count against the breaker
+    only if `classify` (default is_outage) says so.
+    """
+    host_breaker = breaker(host)
+    if not host_breaker.allow():
+        raise UpstreamUnavailable(f"{host} is unavailable (circuit open)")
+    with _host_slot(host):
+        _bucket.acquire(cost)
+        request = Request()
+        start = time.perf_counter()
+        try:
+            yield request
+        except Exception as e:
+            _record(host_breaker, start, e, classify)
+            raise
+        _record(host_breaker, start, request.error, classify)
+
+
+_async_host_slots: Dict[str, asyncio.Semaphore] = {}
+
+
+@asynccontextmanager
+async def athrottle(host: str = YAHOO_HOST, cost: float = 1.0,
+                    classify: Callable[[BaseException], bool] = is_outage):
+    """Async variant of throttle(): same token bucket and breaker, per-host asyncio semaphore."""
+    host_breaker = breaker(host)
+    if not host_breaker.allow():
+        raise UpstreamUnavailable(f"{host} is unavailable (circuit open)")
+    if host not in _async_host_slots:
+        _async_host_slots[host] = asyncio.Semaphore(HOST_LIMITS.get(host, DEFAULT_HOST_LIMIT))
+    async with _async_host_slots[host]:
+        await asyncio.to_thread(_bucket.acquire, cost)
+        request = Request()
+        start = time.perf_counter()
+        try:
+            yield request
+        except Exception as e:
+            _record(host_breaker, start, e, classify)
+            raise
+        _record(host_breaker, start, request.error, classify)
+
+
+# --------------------------
+# Executor
+# --------------------------
+
+class FetchExecutor:
+    """
+    Bounded thread pool whose retries are re-scheduled on a timer instead of
+    sleeping inside a worker, so one failing ticker never holds up the others.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+
+    def submit(self, fn: Callable, *args, retries: int = 0, backoff: float = 1.0, **kwargs) -> Future:
+        outer = Future()
+
+        def attempt(n: int):
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                # No point scheduling a retry while the breaker is open
+                if n < retries and not isinstance(e, UpstreamUnavailable):
+                    timer = threading.Timer(backoff * 2 ** n, self._pool.submit, args=(attempt, n + 1))
+                    timer.daemon = True
+                    timer.start()
+                else:
+                    outer.set_exception(e)
+                return
+            outer.set_result(result)
+
+        self._pool.submit(attempt, 0)
+        return outer
+
+    def map(self, fn: Callable, keys: Iterable, **kwargs) -> Tuple[Dict[Any, Any], Dict[Any, Exception]]:
+        """Run fn(key) for every key concurrently; returns (results, errors) keyed like the input."""
+        futures = {key: self.submit(fn, key, **kwargs) for key in keys}
+        results, errors = {}, {}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                errors[key] = e
+        return results, errors
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> FetchExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = FetchExecutor()
+        return _executor
@@ -0,0 +1,130 @@
+"""
+fundamentals.py
+Typed, columnar fundamentals: the handful of yfinance `info` fields the engines read,
+extracted once into a float64/category table indexed by ticker. The full raw `info`
+dicts (150+ keys) stay out of factor tables and live in RAW_INFO, a lazily loaded
+per-ticker store (memory cache first, then one JSON file per ticker on disk).
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+import numpy as np
+import pandas as pd
+
+from market_cache import INFO_CACHE
+
+INFO_STORE_DIR = Path(os.environ.get("INFO_STORE_DIR", "data/info"))
+
+# Every info field read by factor_engine / factor_engine_v2 / holdings_store
+NUMERIC_FIELDS = [
+    "priceToBook", "trailingPE",
+    "marketCap",
+    "netExpenseRatio", "expenseRatio", "managementExpenseRatio", "totalExpenseRatio",
+    "returnOnEquity", "returnOnAssets", "grossMargins",
+    "earningsQuarterlyGrowth", "revenueGrowth", "revenueGrowthQuarterlyYOY",
+]
+GROUP_FIELDS = ["sector", "category"]  # labels for within-group normalization (normalization.py)
+CATEGORY_FIELDS = ["quoteType"] + GROUP_FIELDS
+FIELDS = CATEGORY_FIELDS + NUMERIC_FIELDS
+
+
+# --------------------------
+# Typed table
+# --------------------------
+
+def _number(value: Any) -> float:
+    """Numeric field -> float; None, strings such as "Infinity" and other junk -> NaN."""
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        value = float(value)
+        return value if np.isfinite(value) else np.nan
+    return np.nan
+
+
+def fundamentals_table(infos: Dict[str, Dict[str, Any]]) -> pd.DataFrame:
+    """
+    One row per ticker: quoteType (category, upper-case), sector / category (category,
+    missing -> NaN) + NUMERIC_FIELDS (float64).
+    """
+    tickers = list(infos)
+    numeric = np.full((len(tickers), len(NUMERIC_FIELDS)), np.nan)
+    quote_types = []
+    labels = {f: [] for f in GROUP_FIELDS}
+    for i, ticker in enumerate(tickers):
+        info = infos[ticker] or {}
+        numeric[i] = [_number(info.get(f)) for f in NUMERIC_FIELDS]
+        quote_types.append(str(info.get("quoteType") or "").upper())
+        for f in GROUP_FIELDS:
+            labels[f].append(info.get(f) or None)
+
+    table = pd.DataFrame(numeric, index=pd.Index(tickers, name="Ticker"), columns=NUMERIC_FIELDS)
+    for position, f in enumerate(CATEGORY_FIELDS):
+        table.insert(position, f, pd.Categorical(quote_types if f == "quoteType" else labels[f]))
+    return table
+
+
+def from_etf_data(etf_data: Dict[str, Dict[str, Any]]) -> pd.DataFrame:
+    return fundamentals_table({t: d.get("info", {}) for t, d in etf_data.items()})
+
+
+def first_valid(table: pd.DataFrame, fields) -> pd.Series:
+    """Row-wise first non-NaN value over `fields`, in order."""
+    return table[list(fields)].bfill(axis=1).iloc[:, 0]
+
+
+# --------------------------
+# Raw info store
+# --------------------------
+
+class RawInfoStore:
+    """
+    ticker -> full raw info dict, loaded only when asked for: the shared INFO_CACHE
+    first, then data/info/<TICKER>.json (written whenever info is fetched).
+    """
+
+    def __init__(self, directory: Path = INFO_STORE_DIR):
+        self.directory = directory
+
+    def path(self, ticker: str) -> Path:
+        safe = ticker.upper().replace("/", "_").replace("^", "_IDX_")
+        return self.directory / f"{safe}.json"
+
+    def put(self, ticker: str, info: Dict[str, Any]) -> None:
+        path = self.path(ticker)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(info, default=str))
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"⚠️ Could not store raw info for {ticker}: {e}")
+
+    def get(self, ticker: str, default=None) -> Dict[str, Any]:
+        info = INFO_CACHE.get_stale(ticker.upper())
+        if info is not None:
+            return info
+        path = self.path(ticker)
+        if not path.exists():
+            return default
+        try:
+            return json.loads(path.read_text())
+        except Exception as e:
+            print(f"⚠️ Corrupt raw info file for {ticker}, ignoring: {e}")
+            return default
+
+    def __getitem__(self, ticker: str) -> Dict[str, Any]:
+        info = self.get(ticker)
+        if info is None:
+            raise KeyError(ticker)
+        return info
+
+    def __contains__(self, ticker: str) -> bool:
+        return INFO_CACHE.get_stale(ticker.upper()) is not None or self.path(ticker).exists()
+
+    def __iter__(self) -> Iterator[str]:
+        return (p.stem for p in sorted(self.directory.glob("*.json")))
+
+
+RAW_INFO = RawInfoStore()
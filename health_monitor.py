@@ -0,0 +1,107 @@
+"""
+health_monitor.py
+Background upstream health probe. A daemon thread requests a tiny chart for one
+symbol every PROBE_INTERVAL_SECONDS and keeps a rolling record of the results, so
+the app.py sidebar renders a cached status instead of calling Yahoo on every rerun.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict
+
+from etf_loader_async import CHART_URL, get_sync_session
+from fetch_executor import FETCH_LATENCY, LatencyWindow, UpstreamUnavailable, breaker, throttle
+from market_cache import INFO_CACHE, PRICE_CACHE
+
+PROBE_TICKER = os.environ.get("HEALTH_PROBE_TICKER", "SPY")
+PROBE_INTERVAL_SECONDS = float(os.environ.get("HEALTH_PROBE_INTERVAL", 60))
+PROBE_TIMEOUT_SECONDS = 10
+PROBE_WINDOW = 60  # probes kept for the success rate (an hour at the default interval)
+
+
+class HealthMonitor:
+
+    def __init__(self, ticker: str = PROBE_TICKER, interval: float = PROBE_INTERVAL_SECONDS):
+        self.ticker = ticker
+        self.interval = interval
+        self.probes = LatencyWindow(PROBE_WINDOW)
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --------------------------
+    # Probe loop
+    # --------------------------
+
+    def probe(self) -> bool:
+        """One cheap request (1 day of daily bars); goes through throttle like every other fetch."""
+        start = time.perf_counter()
+        try:
+            with throttle():
+                response = get_sync_session().get(
+                    CHART_URL.format(ticker=self.ticker),
+                    params={"range": "1d", "interval": "1d"},
+                    timeout=PROBE_TIMEOUT_SECONDS,
+                )
+                response.raise_for_status()
+        except UpstreamUnavailable as e:
+            self.last_error = str(e)  # Breaker open: no request was made, nothing to time
+            return False
+        except Exception as e:
+            self.last_error = str(e)[:200]
+            self.probes.record(time.perf_counter() - start, False)
+            return False
+        self.last_error = None
+        self.probes.record(time.perf_counter() - start, True)
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.probe()
+            self._stop.wait(self.interval)
+
+    def start(self) -> "HealthMonitor":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    # --------------------------
+    # Status
+    # --------------------------
+
+    def status(self) -> Dict[str, Any]:
+        """Snapshot for the UI; never touches the network."""
+        probes = self.probes.summary()
+        last = self.probes.samples()[-1:] or None
+        if breaker().is_open:
+            state = "down"
+        elif last is None:
+            state = "unknown"
+        elif not last[0][2]:
+            state = "down"
+        elif probes["success_rate"] < 0.9:
+            state = "degraded"
+        else:
+            state = "ok"
+
+        lookups = {"hits": 0, "misses": 0}
+        for stats in (PRICE_CACHE.stats(), INFO_CACHE.stats()):
+            lookups["hits"] += stats["hits"]
+            lookups["misses"] += stats["misses"]
+        total = lookups["hits"] + lookups["misses"]
+
+        return {
+            "state": state,
+            "last_probe_at": probes["last_at"],
+            "last_error": self.last_error,
+            "probe": probes,
+            "fetch": FETCH_LATENCY.summary(),
+            "cache_hit_ratio": lookups["hits"] / total if total else None,
+            "breaker_open": breaker().is_open,
+        }
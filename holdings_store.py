@@ -0,0 +1,199 @@
+"""
+holdings_store.py
+ETF look-through for the Quality factor. Each ETF's top holdings (symbol, weight) are
+persisted as one Parquet file; constituent fundamentals live in a single shared table,
+so a stock held by many ETFs is fetched once. ETF Quality is the weight-averaged
+constituent quality, computed for all ETFs at once.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from etf_loader import load_info_data
+from fetch_executor import get_executor, throttle
+from market_cache import canonical_tickers
+
+HOLDINGS_DIR = Path(os.environ.get("HOLDINGS_STORE_DIR", "data/holdings"))
+FUNDAMENTALS_PATH = HOLDINGS_DIR / "_constituents.parquet"
+
+# Holdings and constituent fundamentals change slowly
+HOLDINGS_REFRESH_AFTER_SECONDS = 7 * 86400
+FUNDAMENTALS_REFRESH_AFTER_SECONDS = 7 * 86400
+FUNDAMENTALS_BATCH_SIZE = 50  # constituents fetched (and persisted) per batch
+
+# Same fallback order as factor_engine_v2.compute_quality
+QUALITY_FIELDS = ["returnOnEquity", "returnOnAssets", "grossMargins"]
+TOP_WEIGHT_CUTOFF = 0.70  # only the holdings making up the top 70% of the fund
+
+HOLDINGS_COLUMNS = ["Symbol", "Weight"]
+_fundamentals_lock = threading.Lock()
+
+
+# --------------------------
+# Holdings
+# --------------------------
+
+def holdings_path(etf: str) -> Path:
+    safe = etf.upper().replace("/", "_").replace("^", "_IDX_")
+    return HOLDINGS_DIR / f"{safe}.parquet"
+
+
+def normalize_holdings(raw: pd.DataFrame) -> pd.DataFrame:
+    """Symbol + Weight (fraction of the fund) from yfinance's funds_data.top_holdings."""
+    if raw is None or raw.empty:
+        return pd.DataFrame(columns=HOLDINGS_COLUMNS)
+    df = raw.reset_index() if "Symbol" not in raw.columns else raw.copy()
+    if "Holding Percent" in df.columns:
+        df["Weight"] = pd.to_numeric(df["Holding Percent"], errors="coerce")
+    else:
+        # Older holdings tables: "12.3%" strings plus a "Total" row
+        if "Holding" in df.columns:
+            df = df[df["Holding"] != "Total"]
+        df["Weight"] = pd.to_numeric(df["Weight"].astype(str).str.rstrip("%"), errors="coerce") / 100
+    df["Symbol"] = df["Symbol"].astype(str).str.strip().str.upper()
+    df = df[(df["Symbol"] != "") & (df["Weight"] > 0)]
+    return df[HOLDINGS_COLUMNS].reset_index(drop=True)
+
+
+def fetch_holdings(etf: str) -> pd.DataFrame:
+    with throttle():
+        raw = yf.Ticker(etf).funds_data.top_holdings
+    return normalize_holdings(raw)
+
+
+def read_holdings(etf: str) -> pd.DataFrame:
+    path = holdings_path(etf)
+    if not path.exists():
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"⚠️ Corrupt holdings file for {etf}, ignoring: {e}")
+        return None
+
+
+def _write_atomic(df: pd.DataFrame, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    df.to_parquet(tmp)
+    os.replace(tmp, path)
+
+
+def _is_stale(path: Path, max_age: float) -> bool:
+    return not path.exists() or time.time() - path.stat().st_mtime > max_age
+
+
+def load_holdings(etfs: Iterable[str]) -> Dict[str, pd.DataFrame]:
+    """
+    Store-first: only missing or week-old holdings are fetched (concurrently, through
+    the fetch executor). An empty table (e.g. no equity holdings) is stored too, so it
+    is not re-requested. A failed refresh serves the stored table.
+    """
+    etfs = canonical_tickers(etfs)
+    stale = [e for e in etfs if _is_stale(holdings_path(e), HOLDINGS_REFRESH_AFTER_SECONDS)]
+    fetched, errors = get_executor().map(fetch_holdings, stale, retries=1)
+
+    results = {}
+    for etf in etfs:
+        if etf in fetched:
+            _write_atomic(fetched[etf], holdings_path(etf))
+            results[etf] = fetched[etf]
+            continue
+        if etf in errors:
+            print(f"⚠️ Holdings fetch failed for {etf}: {errors[etf]}")
+        stored = read_holdings(etf)
+        results[etf] = stored if stored is not None else pd.DataFrame(columns=HOLDINGS_COLUMNS)
+    return results
+
+
+# --------------------------
+# Constituent fundamentals
+# --------------------------
+
+def read_fundamentals() -> pd.DataFrame:
+    """Symbol-indexed QUALITY_FIELDS + fetched_at (epoch seconds)."""
+    if FUNDAMENTALS_PATH.exists():
+        try:
+            return pd.read_parquet(FUNDAMENTALS_PATH)
+        except Exception as e:
+            print(f"⚠️ Corrupt constituent table, rebuilding: {e}")
+    return pd.DataFrame(columns=QUALITY_FIELDS + ["fetched_at"], dtype="float64")
+
+
+def _fundamentals_rows(infos: Dict[str, Dict]) -> pd.DataFrame:
+    rows = pd.DataFrame.from_dict(
+        {symbol: {f: (info or {}).get(f) for f in QUALITY_FIELDS} for symbol, info in infos.items()},
+        orient="index", columns=QUALITY_FIELDS,
+    )
+    rows = rows.apply(pd.to_numeric, errors="coerce").astype("float64")
+    rows["fetched_at"] = time.time()
+    return rows
+
+
+def load_constituent_fundamentals(symbols: Iterable[str]) -> pd.DataFrame:
+    """
+    Quality inputs for every unique constituent. Symbols missing from the shared table
+    (or older than a week) are fetched in batches of FUNDAMENTALS_BATCH_SIZE through the
+    info cache / single-flight loader; the table is persisted after every batch.
+    """
+    symbols = list(canonical_tickers(symbols))
+    with _fundamentals_lock:
+        table = read_fundamentals()
+        fresh = table.index[table["fetched_at"] > time.time() - FUNDAMENTALS_REFRESH_AFTER_SECONDS]
+        missing = [s for s in symbols if s not in fresh]
+
+        for i in range(0, len(missing), FUNDAMENTALS_BATCH_SIZE):
+            batch = missing[i:i + FUNDAMENTALS_BATCH_SIZE]
+            print(f"📥 Constituent fundamentals: {i + len(batch)}/{len(missing)}")
+            infos, errors = get_executor().map(load_info_data, batch, retries=1)
+            if errors:
+                print(f"⚠️ {len(errors)} constituent lookups failed (retried next run)")
+            if infos:
+                rows = _fundamentals_rows(infos)
+                table = pd.concat([table.drop(index=rows.index, errors="ignore"), rows])
+                _write_atomic(table, FUNDAMENTALS_PATH)
+
+    return table.reindex(symbols)[QUALITY_FIELDS]
+
+
+# --------------------------
+# Weighted quality
+# --------------------------
+
+def weighted_quality(holdings: Dict[str, pd.DataFrame], fundamentals: pd.DataFrame) -> pd.Series:
+    """
+    Vectorized over all ETFs: keep each fund's holdings up to TOP_WEIGHT_CUTOFF
+    cumulative weight (at least the largest one), map constituent quality, and take
+    the weighted average over constituents that have a quality value.
+    """
+    etfs = list(holdings)
+    frames = [df.assign(ETF=etf) for etf, df in holdings.items() if not df.empty]
+    if not frames:
+        return pd.Series(np.nan, index=etfs, dtype="float64")
+
+    long = pd.concat(frames, ignore_index=True).sort_values(["ETF", "Weight"], ascending=[True, False])
+    cumulative = long.groupby("ETF")["Weight"].cumsum()
+    long = long[(cumulative <= TOP_WEIGHT_CUTOFF) | ~long["ETF"].duplicated()]
+
+    quality = fundamentals[QUALITY_FIELDS].bfill(axis=1).iloc[:, 0]  # first available field
+    q = long["Symbol"].map(quality)
+    w = long["Weight"].where(q.notna())
+    weighted_sum = (w * q).groupby(long["ETF"]).sum(min_count=1)
+    total_weight = w.groupby(long["ETF"]).sum(min_count=1)
+    return (weighted_sum / total_weight).reindex(etfs)
+
+
+def etf_quality(etfs: Iterable[str]) -> pd.Series:
+    """ETF Quality for many ETFs: one holdings pass, one deduplicated constituent fetch."""
+    holdings = load_holdings(etfs)
+    symbols = set()
+    for df in holdings.values():
+        symbols.update(df["Symbol"])
+    return weighted_quality(holdings, load_constituent_fundamentals(symbols))
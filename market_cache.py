@@ -0,0 +1,167 @@
+"""
+market_cache.py
+Per-ticker in-process caches for loaded market data. A list request is assembled
+from individual ticker entries, so only symbols not already cached are fetched.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, NamedTuple, Tuple
+
+import pandas as pd
+
+from fetch_executor import get_executor
+
+
+def canonical_tickers(tickers: Iterable[str]) -> Tuple[str, ...]:
+    """Stable cache key for a ticker list: stripped, upper-cased, de-duplicated, sorted."""
+    return tuple(sorted({t.strip().upper() for t in tickers if t and t.strip()}))
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate in-memory size of a cached value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes) + sys.getsizeof(value)  # PriceSeries, ndarray
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class CachePolicy(NamedTuple):
+    soft_ttl: float  # older entries are served stale while a background refresh runs
+    hard_ttl: float  # older entries are misses and get refetched inline
+
+
+class MarketDataCache:
+    """
+    Thread-safe key -> value cache shared by every Streamlit session, with
+    stale-while-revalidate: past `soft_ttl` an entry is still returned immediately
+    and `refresher(key)` is scheduled once on the fetch executor.
+    Bounded by `max_bytes`: least-recently-used entries are evicted to stay under it.
+    """
+
+    def __init__(self, name: str, policy: CachePolicy, max_bytes: int = None,
+                 refresher: Callable[[Hashable], Any] = None):
+        self.name = name
+        self.policy = policy
+        self.max_bytes = max_bytes
+        self.refresher = refresher
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.evictions = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            age = None if entry is None else time.time() - entry[1]
+            if age is None or age > self.policy.hard_ttl:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+        if age > self.policy.soft_ttl:
+            self._schedule_refresh(key)
+        return entry[0]
+
+    def _schedule_refresh(self, key: Hashable) -> None:
+        if self.refresher is None:
+            return
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self.refresher(key)
+            except Exception as e:
+                print(f"⚠️ Background refresh of {self.name} {key} failed, keeping stale value: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        get_executor().submit(refresh)
+
+    def get_stale(self, key: Hashable, default=None):
+        """Last stored value regardless of age - served when a refresh fails."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return default if entry is None else entry[0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = estimate_size(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size_bytes -= old[2]
+            self._entries[key] = (value, time.time(), size)
+            self.size_bytes += size
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least-recently-used entries until under budget (the newest entry always stays)."""
+        if self.max_bytes is None:
+            return
+        while self.size_bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self.size_bytes -= size
+            self.evictions += 1
+
+    def get_many(self, keys: Iterable[Hashable]) -> Tuple[Dict[Hashable, Any], List[Hashable]]:
+        """Returns (cached values, keys that still need fetching)."""
+        found, missing = {}, []
+        for key in keys:
+            value = self.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        return found, missing
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "size_bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Price history changes once a day: refresh in the background after 12h, hard-expire after 7 days.
+# Info metadata: background refresh hourly, never served more than a day old.
+# Refreshers are registered by etf_loader.
+PRICE_POLICY = CachePolicy(soft_ttl=12 * 3600, hard_ttl=86400 * 7)
+INFO_POLICY = CachePolicy(soft_ttl=3600, hard_ttl=86400)
+PRICE_CACHE_MAX_BYTES = int(os.environ.get("PRICE_CACHE_MAX_BYTES", 512 * 1024 ** 2))
+INFO_CACHE_MAX_BYTES = int(os.environ.get("INFO_CACHE_MAX_BYTES", 64 * 1024 ** 2))
+PRICE_CACHE = MarketDataCache("prices", PRICE_POLICY, max_bytes=PRICE_CACHE_MAX_BYTES)
+INFO_CACHE = MarketDataCache("info", INFO_POLICY, max_bytes=INFO_CACHE_MAX_BYTES)
+
+# Negative cache: failed fetches are not retried for a short while (keys match single_flight)
+NEGATIVE_CACHE_TTL = float(os.environ.get("NEGATIVE_CACHE_TTL", 300))
+FAILURE_CACHE = MarketDataCache("failures", CachePolicy(NEGATIVE_CACHE_TTL, NEGATIVE_CACHE_TTL))
@@ -0,0 +1,195 @@
+"""
+normalization.py
+Cross-sectional normalization of a whole factor matrix (tickers x factors) in one pass:
+
+- within-group scaling (sector, category, quoteType, ...) or against the whole universe
+- "zscore": mean / sample std (as screener_engine_v2.zscore_series)
+- "robust": median / scaled MAD (1.4826 * MAD ~ std for normal data)
+- optional winsorization at per-group quantiles before scaling
+
+Rows are laid out group by group in a NaN-padded (groups x factors x slots) array, so
+means, standard deviations, medians and quantiles of every group and factor come from
+single NumPy reductions. Groups are padded by size class (powers of two), which keeps the
+padding below 2x even when one group is much larger than the others.
+"""
+
+from typing import Any, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+METHODS = ("zscore", "robust")
+MAD_SCALE = 1.4826
+
+
+class GroupStats(NamedTuple):
+    center: np.ndarray  # groups x factors: mean or median
+    scale: np.ndarray   # groups x factors: std or scaled MAD
+    count: np.ndarray   # groups x factors: observed values
+
+
+# --------------------------
+# Group layout
+# --------------------------
+
+def group_codes(groups: Any, n: int) -> Tuple[np.ndarray, List[Any]]:
+    """Labels -> integer codes (-1 for a missing label) and the label list; None -> one group."""
+    if groups is None:
+        return np.zeros(n, dtype=np.int64), [None]
+    codes, labels = pd.factorize(pd.Series(groups).to_numpy(), use_na_sentinel=True)
+    return codes.astype(np.int64), list(labels)
+
+
+def _size_classes(codes: np.ndarray, n_groups: int):
+    """
+    Per power-of-two size class: (group ids, local group index, slot, row position, width)
+    for every row of those groups.
+    """
+    sizes = np.bincount(codes[codes >= 0], minlength=n_groups)
+    size_class = np.ceil(np.log2(np.maximum(sizes, 1))).astype(np.int64)
+    order = np.argsort(codes, kind="stable")
+    order = order[codes[order] >= 0]
+    sorted_codes = codes[order]
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    slots = np.arange(len(order)) - starts[sorted_codes]
+    for cls in np.unique(size_class[sizes > 0]):
+        group_ids = np.flatnonzero((size_class == cls) & (sizes > 0))
+        local_ids = np.full(n_groups, -1)
+        local_ids[group_ids] = np.arange(len(group_ids))
+        in_class = local_ids[sorted_codes] >= 0
+        yield group_ids, local_ids[sorted_codes[in_class]], slots[in_class], order[in_class], int(sizes[group_ids].max())
+
+
+def _padded(values: np.ndarray, local: np.ndarray, slot: np.ndarray, rows: np.ndarray,
+            n_local: int, width: int) -> np.ndarray:
+    # groups x factors x slots, contiguous along slots: a group's values reduce like a 1-D column
+    block = np.full((n_local, values.shape[1], width), np.nan)
+    block[local, :, slot] = values[rows]
+    return block
+
+
+def _sorted_quantile(ordered: np.ndarray, count: np.ndarray, q: float) -> np.ndarray:
+    """Linear-interpolated quantile of blocks sorted along the last axis (NaNs last)."""
+    pos = np.maximum(count - 1, 0) * q
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    a = np.take_along_axis(ordered, lo[..., None], axis=-1)[..., 0]
+    b = np.take_along_axis(ordered, hi[..., None], axis=-1)[..., 0]
+    return np.where(count > 0, a + (b - a) * (pos - lo), np.nan)
+
+
+# --------------------------
+# Statistics
+# --------------------------
+
+def _block_stats(block: np.ndarray, method: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    observed = ~np.isnan(block)
+    count = observed.sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if method == "zscore":
+            center = np.where(count > 0, np.where(observed, block, 0.0).sum(axis=-1) / count, np.nan)
+            squares = np.where(observed, (block - center[..., None]) ** 2, 0.0)
+            scale = np.sqrt(squares.sum(axis=-1) / (count - 1))
+        else:
+            center = _sorted_quantile(np.sort(block, axis=-1), count, 0.5)
+            deviations = np.sort(np.abs(block - center[..., None]), axis=-1)
+            scale = MAD_SCALE * _sorted_quantile(deviations, count, 0.5)
+    return center, scale, count
+
+
+def group_stats(values: np.ndarray, codes: np.ndarray, n_groups: int, method: str = "zscore") -> GroupStats:
+    """Center / scale / count of every (group, factor); rows with code -1 are left out."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown normalization method '{method}', expected one of {METHODS}")
+    f = values.shape[1]
+    center, scale = np.full((n_groups, f), np.nan), np.full((n_groups, f), np.nan)
+    count = np.zeros((n_groups, f), dtype=np.int64)
+    for group_ids, local, slot, rows, width in _size_classes(codes, n_groups):
+        block = _padded(values, local, slot, rows, len(group_ids), width)
+        center[group_ids], scale[group_ids], count[group_ids] = _block_stats(block, method)
+    return GroupStats(center, scale, count)
+
+
+def group_quantiles(values: np.ndarray, codes: np.ndarray, n_groups: int, qs: Sequence[float]) -> List[np.ndarray]:
+    """Per (group, factor) quantiles (linear interpolation, NaNs ignored), one groups x factors array per q."""
+    out = [np.full((n_groups, values.shape[1]), np.nan) for _ in qs]
+    for group_ids, local, slot, rows, width in _size_classes(codes, n_groups):
+        ordered = np.sort(_padded(values, local, slot, rows, len(group_ids), width), axis=-1)
+        count = (~np.isnan(ordered)).sum(axis=-1)
+        for i, q in enumerate(qs):
+            out[i][group_ids] = _sorted_quantile(ordered, count, q)
+    return out
+
+
+# --------------------------
+# Normalization
+# --------------------------
+
+class RowStats(NamedTuple):
+    values: np.ndarray  # tickers x factors after winsorization
+    center: np.ndarray  # tickers x factors: the center of each row's group
+    scale: np.ndarray
+    count: np.ndarray
+
+
+def row_stats(values: np.ndarray, groups: Any = None, method: str = "zscore", winsorize: float = None,
+              min_group_size: int = 1) -> RowStats:
+    """
+    Per-row center / scale of its group. Rows without a group label, and factors a group
+    observes fewer than min_group_size times, fall back to the whole universe.
+    With winsorize=q, values are first clipped to their group's [q, 1 - q] quantiles.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = values.shape[0]
+    codes, labels = group_codes(groups, n)
+    universe = np.zeros(n, dtype=np.int64)
+
+    if winsorize:
+        lower, upper = group_quantiles(values, codes, len(labels), (winsorize, 1 - winsorize))
+        u_lower, u_upper = group_quantiles(values, universe, 1, (winsorize, 1 - winsorize))
+        lower, upper = np.vstack([lower, u_lower]), np.vstack([upper, u_upper])
+        codes_or_universe = np.where(codes >= 0, codes, len(labels))
+        values = np.clip(values, lower[codes_or_universe], upper[codes_or_universe])
+
+    stats = group_stats(values, codes, len(labels), method)
+    whole = group_stats(values, universe, 1, method) if groups is not None else stats
+    small = stats.count < min_group_size
+    # one row per group (small groups fall back to the universe), then the universe itself
+    # for rows without a group label
+    center, scale, count = (
+        np.vstack([np.where(small, w[:1], g), w[:1]])
+        for g, w in ((stats.center, whole.center), (stats.scale, whole.scale), (stats.count, whole.count))
+    )
+    rows = np.where(codes >= 0, codes, len(labels))
+    return RowStats(values, center[rows], scale[rows], count[rows])
+
+
+def normalize(values: np.ndarray, groups: Any = None, method: str = "zscore", winsorize: float = None,
+              min_group_size: int = 1, higher_is_better: Sequence[bool] = None) -> np.ndarray:
+    """
+    tickers x factors scores: (x - center) / scale within each row's group. A zero or
+    undefined scale gives 0 (as zscore_series); a factor with no observations gives NaN.
+    """
+    stats = row_stats(values, groups, method, winsorize, min_group_size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = (stats.values - stats.center) / stats.scale
+    z = np.where((stats.scale == 0) | np.isnan(stats.scale), 0.0, z)
+    z = np.where(stats.count == 0, np.nan, z)
+    if higher_is_better is not None:
+        z = z * np.where(np.asarray(higher_is_better, dtype=bool), 1.0, -1.0)
+    return z
+
+
+def normalize_frame(factor_df: pd.DataFrame, factors: List[str] = None, group_by: Any = None,
+                    method: str = "zscore", winsorize: float = None, min_group_size: int = 1,
+                    lower_is_better: Sequence[str] = ()) -> pd.DataFrame:
+    """
+    DataFrame front end: every factor column normalized at once. group_by is a column name
+    of factor_df or labels aligned with its rows.
+    """
+    if factors is None:
+        factors = [c for c in factor_df.columns if pd.api.types.is_numeric_dtype(factor_df[c])]
+    groups = factor_df[group_by] if isinstance(group_by, str) else group_by
+    z = normalize(factor_df[factors].to_numpy(dtype=np.float64), groups, method, winsorize, min_group_size,
+                  [f not in lower_is_better for f in factors])
+    return pd.DataFrame(z, index=factor_df.index, columns=factors)
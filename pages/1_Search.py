@@ -1,23 +1,23 @@
 import streamlit as st
 import yfinance as yf
 import pandas as pd
-import time
+from fetch_executor import throttle
 
 @st.cache_data(ttl=86400*7, show_spinner=False, max_entries=500)  # 7 days + bigger cache
 def cached_yf_search(keyword: str) -> list:
     """Cached yfinance search."""
-    time.sleep(0.2)
     try:
-        return yf.Search(keyword, max_results=20).search().quotes
+        with throttle():
+            return yf.Search(keyword, max_results=20).search().quotes
     except:
         return []
 
 @st.cache_data(ttl=86400*7, show_spinner=False, max_entries=500)  # 7 days + bigger cache
 def cached_ticker_info(ticker: str) -> dict:
     """Cached ticker info."""
-    time.sleep(0.2)
     try:
-        return yf.Ticker(ticker).info
+        with throttle():
+            return yf.Ticker(ticker).info
     except:
         return {}
 
@@ -4,9 +4,10 @@ import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 from etf_loader import load_etfs
-from factor_engine_v2 import compute_factors
-from screener_engine_v2 import create_scorecard
+from factor_engine_v2 import compute_factors_panel
+from screener_engine_v2 import ScoringSession, ETF_WEIGHTS
 from performance_analyzer import analyze_tickers, compute_correlation_matrix
+from market_cache import canonical_tickers
 
 st.set_page_config(page_title="Asset Scoring", layout="wide")
 st.title("📊 Asset Scoring & Performance Comparison")
@@ -30,8 +31,11 @@ except:
     st.stop()
 
 
+SCORECARD_PAGE_SIZE = 50
+
+
 def highlight_benchmark(row):
-    if row.name == benchmark:
+    if row["Ticker"] == benchmark:
         return ['border: 1px solid #777; font-weight: bold'] * len(row)
     return [''] * len(row)
 
@@ -41,111 +45,148 @@ if st.button("Analyze"):
         st.warning("Please enter at least one ticker.")
         st.stop()
 
-    all_tickers = list(set(tickers + [benchmark]))
+    all_tickers = list(canonical_tickers(tickers + [benchmark]))
 
     with st.spinner("🔄 Computing Framework..."):
         etf_data = load_etfs(all_tickers, period=period)
-        factor_df = compute_factors(etf_data, period=period)
+        factor_df = compute_factors_panel(etf_data, period=period)
         cum_df, metrics = analyze_tickers(all_tickers, period=period, risk_free_rate=risk_free_rate)
 
-        # --- SECTION 1: FACTOR DNA SCORECARD (Fixed 2 Decimals) ---
-        st.subheader("Factor Scorecard")
+    # Kept across reruns: weight / benchmark changes below only re-rank the cached session
+    st.session_state.scoring_analysis = {
+        "tickers": tickers,
+        "all_tickers": all_tickers,
+        "etf_data": etf_data,
+        "session": ScoringSession(factor_df, is_etf=True),
+        "cum_df": cum_df,
+        "metrics": metrics,
+    }
+
+analysis = st.session_state.get("scoring_analysis")
+if analysis is not None:
+    tickers = analysis["tickers"]
+    all_tickers = analysis["all_tickers"]
+    etf_data = analysis["etf_data"]
+    cum_df, metrics = analysis["cum_df"], analysis["metrics"]
+    session = analysis["session"]
+
+    # --- SECTION 1: FACTOR DNA SCORECARD (Fixed 2 Decimals) ---
+    st.subheader("Factor Scorecard")
+
+    with st.expander("⚖️ Factor weights"):
+        weight_cols = st.columns(len(ETF_WEIGHTS))
+        weights = {
+            factor: col.slider(factor, 0.0, 1.0, float(default), 0.05, key=f"weight_{factor}")
+            for col, (factor, default) in zip(weight_cols, ETF_WEIGHTS.items())
+        }
+
+    if benchmark in session.tickers:
         st.caption(f"Z-Scores relative to {benchmark}.")
-
-        scorecard = create_scorecard(factor_df, is_etf=True, benchmark_ticker=benchmark)
-
-        # Round numeric data
-        numeric_cols = scorecard.select_dtypes(include=[np.number]).columns
-        scorecard[numeric_cols] = scorecard[numeric_cols].round(2)
-
-        # Format display (subset prevents ValueError on strings)
-        st.dataframe(
-            scorecard.style.apply(highlight_benchmark, axis=1).format(
-                subset=numeric_cols,
-                formatter="{:.2f}"
-            ),
-            use_container_width=True
+    else:
+        st.caption(f"{benchmark} is not in the analysis, Z-Scores relative to the group mean. Press Analyze to load it.")
+
+    # Only the rows on screen are selected, formatted and styled (argpartition, no full sort)
+    n_pages = max(1, -(-len(session.tickers) // SCORECARD_PAGE_SIZE))
+    page = 1
+    if n_pages > 1:
+        page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1)
+    result = session.page(int(page), SCORECARD_PAGE_SIZE, weights, benchmark_ticker=benchmark)
+    scorecard = result.scorecard
+    if result.benchmark_rank is not None:
+        st.caption(f"{benchmark} ranks {result.benchmark_rank} of {result.total}.")
+
+    # Round numeric data
+    numeric_cols = scorecard.select_dtypes(include=[np.number]).columns
+    scorecard[numeric_cols] = scorecard[numeric_cols].round(2)
+
+    # Format display (subset prevents ValueError on strings)
+    st.dataframe(
+        scorecard.style.apply(highlight_benchmark, axis=1).format(
+            subset=numeric_cols,
+            formatter="{:.2f}"
+        ),
+        use_container_width=True
+    )
+
+    # --- SECTION 2: CUMULATIVE PERFORMANCE ---
+    st.subheader("Cumulative Performance")
+    fig_perf = go.Figure()
+    for t in tickers:
+        if t in cum_df.columns:
+            fig_perf.add_trace(go.Scatter(x=cum_df.index, y=cum_df[t], mode="lines", name=t))
+
+    if benchmark in cum_df.columns:
+        fig_perf.add_trace(go.Scatter(
+            x=cum_df.index, y=cum_df[benchmark],
+            mode="lines", name=f"Benchmark ({benchmark})",
+            line=dict(dash="dash", color="white", width=2)
+        ))
+
+    fig_perf.update_layout(template="plotly_dark", height=450)
+    fig_perf.update_yaxes(tickformat=".1%")
+    st.plotly_chart(fig_perf, use_container_width=True)
+
+    # --- SECTION 3: REVERSED BRANDED CORRELATION HEATMAP ---
+    st.subheader("Correlation Matrix")
+
+    price_dict = {}
+    for t in all_tickers:
+        if t in etf_data and not etf_data[t]["prices"].empty:
+            try:
+                s = etf_data[t]["prices"]["Adj Close"].squeeze()
+                if isinstance(s, pd.DataFrame): s = s.iloc[:, 0]
+                price_dict[t] = s
+            except:
+                continue
+
+    prices_df = pd.DataFrame(price_dict).dropna()
+
+    if not prices_df.empty and len(prices_df.columns) > 1:
+        corr_matrix = compute_correlation_matrix(prices_df)
+
+        # --- POLES REVERSED ---
+        # Teal is now Negative (0.0), Red is now Positive (1.0)
+        brand_colors_reversed = [
+            [0.0, "#16A085"],  # Strong negative (Brand Teal)
+            [0.25, "#A7D6C9"],  # Mild negative (Light sage)
+            [0.5, "#F2F4F3"],  # Neutral (Warm light grey)
+            [0.75, "#E6CFC8"],  # Mild positive (Soft sand)
+            [1.0, "#C97A6A"]  # Strong positive (Muted clay red)
+        ]
+
+        fig_corr = px.imshow(
+            corr_matrix,
+            text_auto=".2f",
+            aspect="auto",
+            color_continuous_scale=brand_colors_reversed,
+            range_color=[-1, 1],
+            labels=dict(color="Correlation")
         )
 
-        # --- SECTION 2: CUMULATIVE PERFORMANCE ---
-        st.subheader("Cumulative Performance")
-        fig_perf = go.Figure()
-        for t in tickers:
-            if t in cum_df.columns:
-                fig_perf.add_trace(go.Scatter(x=cum_df.index, y=cum_df[t], mode="lines", name=t))
-
-        if benchmark in cum_df.columns:
-            fig_perf.add_trace(go.Scatter(
-                x=cum_df.index, y=cum_df[benchmark],
-                mode="lines", name=f"Benchmark ({benchmark})",
-                line=dict(dash="dash", color="white", width=2)
-            ))
-
-        fig_perf.update_layout(template="plotly_dark", height=450)
-        fig_perf.update_yaxes(tickformat=".1%")
-        st.plotly_chart(fig_perf, use_container_width=True)
-
-        # --- SECTION 3: REVERSED BRANDED CORRELATION HEATMAP ---
-        st.subheader("Correlation Matrix")
-
-        price_dict = {}
-        for t in all_tickers:
-            if t in etf_data and not etf_data[t]["prices"].empty:
-                try:
-                    s = etf_data[t]["prices"]["Adj Close"].squeeze()
-                    if isinstance(s, pd.DataFrame): s = s.iloc[:, 0]
-                    price_dict[t] = s
-                except:
-                    continue
-
-        prices_df = pd.DataFrame(price_dict).dropna()
-
-        if not prices_df.empty and len(prices_df.columns) > 1:
-            corr_matrix = compute_correlation_matrix(prices_df)
-
-            # --- POLES REVERSED ---
-            # Teal is now Negative (0.0), Red is now Positive (1.0)
-            brand_colors_reversed = [
-                [0.0, "#16A085"],  # Strong negative (Brand Teal)
-                [0.25, "#A7D6C9"],  # Mild negative (Light sage)
-                [0.5, "#F2F4F3"],  # Neutral (Warm light grey)
-                [0.75, "#E6CFC8"],  # Mild positive (Soft sand)
-                [1.0, "#C97A6A"]  # Strong positive (Muted clay red)
-            ]
-
-            fig_corr = px.imshow(
-                corr_matrix,
-                text_auto=".2f",
-                aspect="auto",
-                color_continuous_scale=brand_colors_reversed,
-                range_color=[-1, 1],
-                labels=dict(color="Correlation")
-            )
-
-            fig_corr.update_layout(
-                height=600,
-                font=dict(size=16),
-                margin=dict(l=20, r=20, t=20, b=20),
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)'
-            )
-            fig_corr.update_traces(textfont_size=18)
-            st.plotly_chart(fig_corr, use_container_width=True)
-        else:
-            st.info("Add more tickers to see correlation.")
-
-        # --- SECTION 4: PERFORMANCE METRICS (2 DECIMALS) ---
-        st.subheader("Performance Metrics")
-        metrics_df = pd.DataFrame(metrics).T
-
-        pct_cols = ["Total Return", "Annual Return", "Annual Volatility"]
-        for col in pct_cols:
-            if col in metrics_df.columns:
-                metrics_df[col] = (metrics_df[col] * 100)
-
-        st.table(metrics_df.style.format({
-            "Total Return": "{:.2f}%",
-            "Annual Return": "{:.2f}%",
-            "Annual Volatility": "{:.2f}%",
-            "Sharpe Ratio": "{:.2f}"
-        }, na_rep="-"))
\ No newline at end of file
+        fig_corr.update_layout(
+            height=600,
+            font=dict(size=16),
+            margin=dict(l=20, r=20, t=20, b=20),
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)'
+        )
+        fig_corr.update_traces(textfont_size=18)
+        st.plotly_chart(fig_corr, use_container_width=True)
+    else:
+        st.info("Add more tickers to see correlation.")
+
+    # --- SECTION 4: PERFORMANCE METRICS (2 DECIMALS) ---
+    st.subheader("Performance Metrics")
+    metrics_df = pd.DataFrame(metrics).T
+
+    pct_cols = ["Total Return", "Annual Return", "Annual Volatility"]
+    for col in pct_cols:
+        if col in metrics_df.columns:
+            metrics_df[col] = (metrics_df[col] * 100)
+
+    st.table(metrics_df.style.format({
+        "Total Return": "{:.2f}%",
+        "Annual Return": "{:.2f}%",
+        "Annual Volatility": "{:.2f}%",
+        "Sharpe Ratio": "{:.2f}"
+    }, na_rep="-"))
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""
+parallel_screen.py
+Multi-process screening for very large universes. Every ticker's prices are written
+once into a shared-memory matrix (bars x tickers, justified to the bottom as in
+price_panel, column-major so each ticker chunk is contiguous); worker processes attach
+to it by name and work on column ranges, so no DataFrames are pickled to the workers.
+Per-date outputs (cumulative returns) are written into a second shared matrix.
+Each chunk runs the same column code as the serial path, so merged results are identical.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import price_panel
+
+# Below this many tickers process start-up costs more than it saves
+PARALLEL_MIN_TICKERS = int(os.environ.get("SCREEN_PARALLEL_MIN_TICKERS", 2000))
+MAX_PROCESSES = int(os.environ.get("SCREEN_PROCESSES", os.cpu_count() or 1))
+CHUNK_TICKERS = 500
+
+_worker: Dict[str, Any] = {}
+
+
+def use_parallel(n_tickers: int, processes: int = None) -> bool:
+    if processes is None:
+        return n_tickers >= PARALLEL_MIN_TICKERS and MAX_PROCESSES > 1
+    return processes > 1
+
+
+# --------------------------
+# Shared matrices
+# --------------------------
+
+class SharedPanel:
+    """Owner side of the shared price matrix (+ optional output matrix of the same shape)."""
+
+    def __init__(self, arrays: List[np.ndarray], with_output: bool = False):
+        counts = np.fromiter((len(a) for a in arrays), dtype=np.int64, count=len(arrays))
+        self.shape = (max(int(counts.max(initial=0)), 1), len(arrays))
+        self.counts = counts
+        size = int(np.prod(self.shape)) * 8
+        self._blocks = [shared_memory.SharedMemory(create=True, size=size)]
+        values = np.ndarray(self.shape, dtype=np.float64, buffer=self._blocks[0].buf, order="F")
+        values.fill(np.nan)
+        for j, a in enumerate(arrays):
+            if len(a):
+                values[-len(a):, j] = a
+        self.output = None
+        if with_output:
+            self._blocks.append(shared_memory.SharedMemory(create=True, size=size))
+            self.output = np.ndarray(self.shape, dtype=np.float64, buffer=self._blocks[1].buf, order="F")
+            self.output.fill(np.nan)
+
+    @property
+    def spec(self) -> Tuple:
+        """What a worker needs to attach: block names, shape, counts."""
+        return tuple(b.name for b in self._blocks), self.shape, self.counts
+
+    def close(self) -> None:
+        self.output = None
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self) -> "SharedPanel":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _attach(spec: Tuple) -> None:
+    """Worker initializer: map the shared matrices once per process."""
+    names, shape, counts = spec
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    _worker["blocks"] = blocks  # keep the mappings alive
+    _worker["values"] = np.ndarray(shape, dtype=np.float64, buffer=blocks[0].buf, order="F")
+    _worker["output"] = (np.ndarray(shape, dtype=np.float64, buffer=blocks[1].buf, order="F")
+                         if len(blocks) > 1 else None)
+    _worker["counts"] = counts
+
+
+def _chunk(lo: int, hi: int) -> Tuple[np.ndarray, np.ndarray]:
+    # C-ordered copy of the column range: same memory layout (and summation order) as the serial panel
+    return np.ascontiguousarray(_worker["values"][:, lo:hi]), _worker["counts"][lo:hi]
+
+
+def run_chunks(panel: SharedPanel, job: Callable, params: Dict[str, Any], processes: int = None,
+               chunk: int = CHUNK_TICKERS) -> List[Any]:
+    """Run job(lo, hi, **params) over ticker chunks in a process pool; results in chunk order."""
+    n = panel.shape[1]
+    bounds = [(lo, min(lo + chunk, n)) for lo in range(0, n, chunk)]
+    processes = min(processes or MAX_PROCESSES, len(bounds)) or 1
+    with ProcessPoolExecutor(max_workers=processes, initializer=_attach, initargs=(panel.spec,)) as pool:
+        futures = [pool.submit(job, lo, hi, **params) for lo, hi in bounds]
+        return [f.result() for f in futures]
+
+
+# --------------------------
+# Jobs
+# --------------------------
+
+def _price_factor_job(lo: int, hi: int, period: str, schema: str) -> Dict[str, np.ndarray]:
+    values, counts = _chunk(lo, hi)
+    return price_panel.panel_factors(values, counts, period, schema)
+
+
+def _performance_job(lo: int, hi: int, risk_free_rate: float) -> List[Dict[str, float]]:
+    """performance_analyzer on each column; cumulative returns go to the shared output matrix."""
+    from performance_analyzer import compute_metrics, cumulative_performance
+
+    values, counts = _chunk(lo, hi)
+    output = _worker["output"]
+    metrics = []
+    for j in range(hi - lo):
+        prices = pd.Series(values[values.shape[0] - counts[j]:, j])
+        cum = cumulative_performance(prices).to_numpy()
+        output[output.shape[0] - len(cum):, lo + j] = cum
+        metrics.append(compute_metrics(prices, risk_free_rate=risk_free_rate))
+    return metrics
+
+
+# --------------------------
+# Entry points
+# --------------------------
+
+def price_factors(prices: Dict[str, Any], period: str = "5y", schema: str = "v2", processes: int = None) -> pd.DataFrame:
+    """Parallel price_panel.price_factors (identical output)."""
+    tickers = list(prices)
+    with SharedPanel([price_panel.price_values(prices[t]) for t in tickers]) as panel:
+        chunks = run_chunks(panel, _price_factor_job, {"period": period, "schema": schema}, processes)
+    factors = {name: np.concatenate([c[name] for c in chunks]) for name in chunks[0]} if chunks else {}
+    return pd.DataFrame(factors, index=pd.Index(tickers, name="Ticker"))
+
+
+def performance(series: Dict[str, Any], risk_free_rate: float = 0.0, processes: int = None) -> Tuple[Dict[str, np.ndarray], List[Dict]]:
+    """
+    Cumulative-return arrays (one per ticker, oldest first) and compute_metrics dicts,
+    computed in worker processes from the shared price matrix.
+    """
+    tickers = list(series)
+    with SharedPanel([price_panel.price_values(series[t]) for t in tickers], with_output=True) as panel:
+        chunks = run_chunks(panel, _performance_job, {"risk_free_rate": risk_free_rate}, processes)
+        rows = panel.shape[0]
+        cumulative = {t: panel.output[rows - panel.counts[j]:, j].copy() for j, t in enumerate(tickers)}
+    return cumulative, [m for chunk in chunks for m in chunk]
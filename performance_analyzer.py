@@ -1,12 +1,15 @@
-import streamlit as st
 import pandas as pd
 import numpy as np
 from typing import List, Dict
-from etf_loader import load_etfs
+from etf_loader import load_price_series
+from price_series import PriceSeries
+import parallel_screen
 
 # -------------------------- Metrics Calculation -----------------------
 def compute_metrics(prices: pd.Series, risk_free_rate: float = 0.03) -> dict:
     """Compute performance metrics for a single price series."""
+    if isinstance(prices, PriceSeries):
+        prices = prices.to_series()
     if isinstance(prices, pd.DataFrame):
         prices = prices.squeeze()
     prices = prices.dropna()
@@ -27,6 +30,8 @@ def compute_metrics(prices: pd.Series, risk_free_rate: float = 0.03) -> dict:
 # -------------------------- Cumulative Performance --------------------
 def cumulative_performance(prices: pd.Series) -> pd.Series:
     """Return cumulative returns series from price series."""
+    if isinstance(prices, PriceSeries):
+        prices = prices.to_series()
     if isinstance(prices, pd.DataFrame):
         prices = prices.squeeze()
     prices = prices.dropna()
@@ -35,27 +40,45 @@ def cumulative_performance(prices: pd.Series) -> pd.Series:
     return cum_returns
 
 # -------------------------- Analyze multiple tickers -------------------
-@st.cache_data(ttl=86400*7, show_spinner=False, max_entries=500)  # 7 days + bigger cache
-def analyze_tickers(tickers: List[str], period: str = "5y", risk_free_rate: float = 0.0):
-    """Cached analysis using shared etf_loader cache."""
-    etf_data = load_etfs(tickers, period=period)  # Uses cached loader
-    cum_df = pd.DataFrame()
-    metrics = {}
-
+# Not st.cache_data: a result with a failed ticker would otherwise be pinned for 7 days.
+# The downloads themselves are cached per ticker by etf_loader.
+def analyze_tickers(tickers: List[str], period: str = "5y", risk_free_rate: float = 0.0, processes: int = None):
+    """
+    Analysis on top of the shared etf_loader cache. Large universes (or processes > 1)
+    are split into ticker chunks computed in a process pool over a shared price matrix;
+    the result is identical to the serial loop.
+    """
+    price_series = load_price_series(tickers, period=period)  # Uses cached loader
+    present = []
     for ticker in tickers:
-        try:
-            prices = etf_data[ticker]["prices"]["Adj Close"]
-        except KeyError:
+        prices = price_series.get(ticker)
+        if prices is None or prices.empty:
             print(f"⚠️ {ticker} missing 'Adj Close', skipping")
             continue
+        present.append(ticker)
 
-        if isinstance(prices, pd.DataFrame):
-            prices = prices.squeeze()
+    cum_columns = {}
+    metrics = {}
+    if parallel_screen.use_parallel(len(present), processes):
+        cumulative, rows = parallel_screen.performance({t: price_series[t] for t in present}, risk_free_rate, processes)
+        for ticker, row in zip(present, rows):
+            cum_columns[ticker] = pd.Series(cumulative[ticker], index=price_series[ticker].index(), name=ticker)
+            metrics[ticker] = row
+    else:
+        for ticker in present:
+            prices = price_series[ticker]
+            cum_columns[ticker] = cumulative_performance(prices)
+            metrics[ticker] = compute_metrics(prices, risk_free_rate=risk_free_rate)
+
+    return _cumulative_frame(cum_columns), metrics
 
-        cum_df[ticker] = cumulative_performance(prices)
-        metrics[ticker] = compute_metrics(prices, risk_free_rate=risk_free_rate)
 
-    return cum_df, metrics
+def _cumulative_frame(columns: Dict[str, pd.Series]) -> pd.DataFrame:
+    """Columns aligned to the first ticker's dates (as column-by-column assignment would), built in one step."""
+    if not columns:
+        return pd.DataFrame()
+    index = next(iter(columns.values())).index
+    return pd.DataFrame({t: s.reindex(index) for t, s in columns.items()}, index=index)
 
 
 # -------------------------- Correlation Matrix -----------------------
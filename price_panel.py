@@ -0,0 +1,143 @@
+"""
+price_panel.py
+Vectorized price factors over many tickers at once. Each ticker's valid Adj Close
+values are packed into one column of a (rows x tickers) float array, justified to the
+bottom: row -1 is every ticker's last price, row -n its n-th last, and NaN fills the
+top of shorter histories. That reproduces the per-ticker `prices.iloc[-n]` logic of
+the factor engines with plain NumPy column operations.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from price_series import PRICE_COLUMN, PriceSeries
+
+TRADING_DAYS = 252
+PANEL_CHUNK = 1000  # tickers per block, bounds the temporary arrays for very large universes
+
+
+# --------------------------
+# Building the panel
+# --------------------------
+
+def price_values(prices: Any) -> np.ndarray:
+    """Valid Adj Close values of one ticker (PriceSeries, Series or OHLCV frame), oldest first."""
+    if isinstance(prices, PriceSeries):
+        return prices.values
+    if isinstance(prices, pd.DataFrame):
+        if prices.empty or PRICE_COLUMN not in prices.columns:
+            return np.empty(0)
+        prices = prices[PRICE_COLUMN]
+        if isinstance(prices, pd.DataFrame):
+            prices = prices.iloc[:, 0]
+    if prices is None or len(prices) == 0:
+        return np.empty(0)
+    return prices.dropna().to_numpy(dtype=np.float64)
+
+
+def stack_justified(arrays: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """(rows x tickers) panel with each array justified to the bottom, plus valid counts."""
+    counts = np.fromiter((len(a) for a in arrays), dtype=np.int64, count=len(arrays))
+    panel = np.full((max(counts.max(initial=0), 1), len(arrays)), np.nan)
+    for j, values in enumerate(arrays):
+        if len(values):
+            panel[-len(values):, j] = values
+    return panel, counts
+
+
+def justify_bottom(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Move each column's non-NaN values to the bottom (order kept) - for date-aligned panels."""
+    valid = ~np.isnan(matrix)
+    order = np.argsort(valid, axis=0, kind="stable")  # NaN rows first, then valid rows in date order
+    return np.take_along_axis(matrix, order, axis=0), valid.sum(axis=0)
+
+
+def align_panel(prices: Dict[str, Any]) -> pd.DataFrame:
+    """Dates x tickers Adj Close frame on the union of all dates (NaN where a ticker has no bar)."""
+    columns = {}
+    for ticker, p in prices.items():
+        if isinstance(p, PriceSeries):
+            columns[ticker] = p.to_series()
+        else:
+            values = price_values(p)
+            if len(values):
+                series = p[PRICE_COLUMN] if isinstance(p, pd.DataFrame) else p
+                columns[ticker] = series.squeeze().dropna()
+    return pd.DataFrame(columns)
+
+
+# --------------------------
+# Column-wise factors
+# --------------------------
+
+def panel_return(panel: np.ndarray, counts: np.ndarray, start_back: int, end_back: int = 1) -> np.ndarray:
+    """prices.iloc[-end_back] / prices.iloc[-start_back] - 1 per column; NaN without enough history."""
+    rows = panel.shape[0]
+    if start_back > rows or start_back < end_back:
+        return np.full(panel.shape[1], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = panel[rows - end_back] / panel[rows - start_back] - 1
+    return np.where(counts >= start_back, result, np.nan)
+
+
+def panel_volatility(panel: np.ndarray, counts: np.ndarray, periods_per_year: int = TRADING_DAYS) -> np.ndarray:
+    """Annualized sample std of simple returns (ddof=1), matching returns.std() * sqrt(252)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = panel[1:] / panel[:-1] - 1
+        n = np.maximum(counts - 1, 0)
+        mean = np.nansum(returns, axis=0) / n
+        var = np.nansum((returns - mean) ** 2, axis=0) / (n - 1)
+    return np.where(n >= 2, np.sqrt(var) * np.sqrt(periods_per_year), np.nan)
+
+
+def panel_max_drawdown(panel: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Most negative price / running peak - 1 per column (NaN rows on top are skipped by fmax)."""
+    peak = np.fmax.accumulate(panel, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdown = panel / peak - 1
+    return np.where(counts > 0, np.fmin.reduce(drawdown, axis=0), np.nan)
+
+
+# --------------------------
+# Factor tables
+# --------------------------
+
+def momentum_lookback(period: str = "5y", months: int = 12) -> int:
+    """factor_engine_v2.compute_momentum: 6 months for a 1y window, else `months`."""
+    return 21 * (6 if period.lower() == "1y" else months)
+
+
+def panel_factors(panel: np.ndarray, counts: np.ndarray, period: str = "5y", schema: str = "v2") -> Dict[str, np.ndarray]:
+    """
+    schema="v2": Momentum (factor_engine_v2), Volatility.
+    schema="v1": Momentum (12-1), Growth (1y), Volatility, MaxDrawdown (factor_engine).
+    """
+    if schema == "v1":
+        return {
+            "Momentum": panel_return(panel, counts, 12 * 21 + 21, end_back=21),
+            "Growth": panel_return(panel, counts, TRADING_DAYS),
+            "Volatility": panel_volatility(panel, counts),
+            "MaxDrawdown": panel_max_drawdown(panel, counts),
+        }
+    return {
+        "Momentum": panel_return(panel, counts, momentum_lookback(period)),
+        "Volatility": panel_volatility(panel, counts),
+    }
+
+
+def price_factors(prices: Dict[str, Any], period: str = "5y", schema: str = "v2") -> pd.DataFrame:
+    """
+    Price-based factors (see panel_factors) for every ticker, indexed by ticker.
+    Tickers are processed in PANEL_CHUNK blocks so 5,000+ tickers stay memory-bounded.
+    """
+    tickers = list(prices)
+    blocks = []
+    for i in range(0, len(tickers), PANEL_CHUNK):
+        block = tickers[i:i + PANEL_CHUNK]
+        panel, counts = stack_justified([price_values(prices[t]) for t in block])
+        blocks.append(pd.DataFrame(panel_factors(panel, counts, period, schema), index=pd.Index(block, name="Ticker")))
+    if not blocks:
+        return pd.DataFrame(index=pd.Index([], name="Ticker"))
+    return pd.concat(blocks)
@@ -0,0 +1,97 @@
+"""
+price_series.py
+Compact price container used by the in-memory caches: an int64 (ns) date array and a
+float values array, nothing else. The engines only ever read Adj Close, so the loaders
+project that single column at load time instead of keeping full OHLCV frames.
+"""
+
+import numpy as np
+import pandas as pd
+
+import price_store
+
+PRICE_COLUMN = "Adj Close"
+PRICE_DTYPE = np.float64  # np.float32 halves the values array if precision allows
+
+
+class PriceSeries:
+    __slots__ = ("dates", "values", "name")
+
+    def __init__(self, dates: np.ndarray, values: np.ndarray, name: str = None):
+        self.dates = dates
+        self.values = values
+        self.name = name
+
+    # --------------------------
+    # Construction
+    # --------------------------
+
+    @classmethod
+    def from_series(cls, prices: pd.Series, name: str = None, dtype=PRICE_DTYPE) -> "PriceSeries":
+        if isinstance(prices, pd.DataFrame):
+            prices = prices.squeeze(axis=1)
+        prices = prices.dropna()
+        index = pd.DatetimeIndex(prices.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        return cls(
+            np.ascontiguousarray(index.as_unit("ns").asi8),
+            np.ascontiguousarray(prices.to_numpy(dtype=dtype)),
+            name if name is not None else prices.name,
+        )
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, column: str = PRICE_COLUMN, name: str = None, dtype=PRICE_DTYPE) -> "PriceSeries":
+        """Column projection: keep only `column` of an OHLCV frame."""
+        df = price_store.flatten_columns(df)
+        if df.empty or column not in df.columns:
+            return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=dtype), name)
+        return cls.from_series(df[column], name=name, dtype=dtype)
+
+    # --------------------------
+    # Views
+    # --------------------------
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.values) == 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.dates.nbytes + self.values.nbytes
+
+    def slice_from(self, start: pd.Timestamp) -> "PriceSeries":
+        """Bars strictly after `start`, as views of the same arrays."""
+        i = np.searchsorted(self.dates, pd.Timestamp(start).as_unit("ns").value, side="right")
+        return PriceSeries(self.dates[i:], self.values[i:], self.name)
+
+    def slice_period(self, period: str) -> "PriceSeries":
+        if self.empty:
+            return self
+        start = price_store.period_start(pd.Timestamp(self.dates[-1]), period)
+        return self if start is None else self.slice_from(start)
+
+    # --------------------------
+    # pandas interop
+    # --------------------------
+
+    def index(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self.dates.view("datetime64[ns]"), name="Date")
+
+    def to_series(self) -> pd.Series:
+        return pd.Series(self.values, index=self.index(), name=self.name, copy=False)
+
+    def to_frame(self, column: str = PRICE_COLUMN) -> pd.DataFrame:
+        """One-column frame for code that expects data["prices"]["Adj Close"]."""
+        if self.empty:
+            return pd.DataFrame()
+        return self.to_series().rename(column).to_frame()
+
+    def __repr__(self) -> str:
+        if self.empty:
+            return f"PriceSeries({self.name}, empty)"
+        first, last = pd.Timestamp(self.dates[0]).date(), pd.Timestamp(self.dates[-1]).date()
+        return f"PriceSeries({self.name}, {len(self)} bars, {first} -> {last})"
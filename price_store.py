@@ -0,0 +1,192 @@
+"""
+price_store.py
+Local columnar price store: one Parquet file per (ticker, interval).
+The loaders read from here first and only fetch bars newer than the last stored date.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+STORE_DIR = Path(os.environ.get("PRICE_STORE_DIR", "data/prices"))
+
+# Intraday intervals have short upstream retention, so they are never stored
+STORABLE_INTERVALS = {"1d", "5d", "1wk", "1mo", "3mo"}
+
+# Re-check upstream for new bars at most this often per file
+REFRESH_AFTER_SECONDS = 12 * 3600
+
+# Re-fetched bars whose Adj Close / Close moved more than this were re-adjusted upstream
+# (split or dividend): the whole stored history is stale, not just the new bars
+REVISION_RTOL = 1e-4
+REVISION_COLUMNS = ("Adj Close", "Close")
+
+# Called as hook(ticker, interval, combined, new_bars) after every successful append
+# (streaming_state registers one to keep its accumulators in step with the store)
+APPEND_HOOKS = []
+
+
+# --------------------------
+# Paths
+# --------------------------
+
+def is_storable(interval: str) -> bool:
+    return interval in STORABLE_INTERVALS
+
+
+def store_path(ticker: str, interval: str = "1d") -> Path:
+    safe = ticker.upper().replace("/", "_").replace("^", "_IDX_")
+    return STORE_DIR / interval / f"{safe}.parquet"
+
+
+# --------------------------
+# Read / Write
+# --------------------------
+
+def flatten_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop the ticker level that yf.download adds to single-ticker frames."""
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.copy()
+        df.columns = df.columns.get_level_values(0)
+    return df
+
+
+def read_prices(ticker: str, interval: str = "1d") -> pd.DataFrame:
+    path = store_path(ticker, interval)
+    if not path.exists():
+        return pd.DataFrame()
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"⚠️ Corrupt price store file for {ticker}, ignoring: {e}")
+        return pd.DataFrame()
+
+
+def write_prices(ticker: str, interval: str, df: pd.DataFrame) -> None:
+    """
+    Atomic write (temp file + rename) so concurrent readers never see a partial file.
+    The temp name is per process and thread, so concurrent writers never share one.
+    """
+    path = store_path(ticker, interval)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    df.to_parquet(tmp)
+    os.replace(tmp, path)
+
+
+def append_prices(ticker: str, interval: str, stored: pd.DataFrame, new_bars: pd.DataFrame) -> pd.DataFrame:
+    """
+    Merge newly fetched bars into the stored history and persist the result.
+    Overlapping dates take the new bar (the last stored bar may have been partial).
+    """
+    new_bars = flatten_columns(new_bars)
+    if new_bars.empty:
+        if not stored.empty:
+            touch(ticker, interval)
+        return stored
+
+    if stored.empty:
+        combined = new_bars
+    else:
+        combined = pd.concat([stored, new_bars])
+        combined = combined[~combined.index.duplicated(keep="last")]
+    combined = combined.sort_index()
+
+    write_prices(ticker, interval, combined)
+    for hook in APPEND_HOOKS:
+        try:
+            hook(ticker, interval, combined, new_bars)
+        except Exception as e:
+            print(f"⚠️ Append hook failed for {ticker}: {e}")
+    return combined
+
+
+def refresh_start(stored: pd.DataFrame) -> str:
+    """
+    Start date for an incremental fetch: the second-to-last stored bar, so the refetch
+    overlaps at least one finalized bar (the last one may have been partial).
+    """
+    return stored.index[max(len(stored) - 2, 0)].strftime("%Y-%m-%d")
+
+
+def is_revised(stored: pd.DataFrame, new_bars: pd.DataFrame, rtol: float = REVISION_RTOL) -> bool:
+    """
+    True if a re-fetched bar that was already final when stored (every stored bar but
+    the last) now has a different Adj Close or Close: Yahoo re-adjusted the back
+    history after a split or dividend, so appending would splice two price scales.
+    """
+    new_bars = flatten_columns(new_bars)
+    if stored.empty or new_bars.empty:
+        return False
+    overlap = stored.index[:-1].intersection(new_bars.index)
+    for column in REVISION_COLUMNS:
+        if column not in stored.columns or column not in new_bars.columns or overlap.empty:
+            continue
+        old = stored.loc[overlap, column].to_numpy(dtype=np.float64)
+        new = new_bars.loc[overlap, column].to_numpy(dtype=np.float64)
+        both = ~np.isnan(old) & ~np.isnan(new)
+        if not np.allclose(old[both], new[both], rtol=rtol, atol=0):
+            return True
+    return False
+
+
+def replace_prices(ticker: str, interval: str, full: pd.DataFrame) -> pd.DataFrame:
+    """Rewrite the stored history with a complete re-fetch (after an upstream re-adjustment)."""
+    print(f"🔄 {ticker}: history re-adjusted upstream (split / dividend), replacing the stored file")
+    full = flatten_columns(full).sort_index()
+    write_prices(ticker, interval, full)
+    for hook in APPEND_HOOKS:
+        try:
+            hook(ticker, interval, full, full)
+        except Exception as e:
+            print(f"⚠️ Append hook failed for {ticker}: {e}")
+    return full
+
+
+def touch(ticker: str, interval: str) -> None:
+    """Mark the file as freshly checked even when upstream had no new bars."""
+    path = store_path(ticker, interval)
+    if path.exists():
+        os.utime(path, None)
+
+
+def needs_refresh(ticker: str, interval: str = "1d") -> bool:
+    path = store_path(ticker, interval)
+    if not path.exists():
+        return True
+    return (time.time() - path.stat().st_mtime) > REFRESH_AFTER_SECONDS
+
+
+# --------------------------
+# Period views
+# --------------------------
+
+def period_start(last_date: pd.Timestamp, period: str):
+    """Translate a yfinance period string ('5d', '6mo', '5y', 'ytd', 'max') into a start date."""
+    period = period.lower()
+    if period == "max":
+        return None
+    if period == "ytd":
+        return last_date.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    if period.endswith("mo"):
+        return last_date - pd.DateOffset(months=int(period[:-2]))
+    if period.endswith("y"):
+        return last_date - pd.DateOffset(years=int(period[:-1]))
+    if period.endswith("d"):
+        return last_date - pd.DateOffset(days=int(period[:-1]))
+    raise ValueError(f"Unsupported period: {period}")
+
+
+def slice_period(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    """Period view of a full history frame."""
+    if df.empty:
+        return df
+    start = period_start(df.index[-1], period)
+    if start is None:
+        return df
+    # Positional slice on the sorted index: a view of the full history, not a copy
+    return df.iloc[df.index.searchsorted(start, side="right"):]
@@ -1,5 +1,7 @@
 import pandas as pd
 import numpy as np
+from typing import Dict, List, NamedTuple, Tuple, Union
+import normalization
 
 # --------------------------
 # CONFIGURABLE WEIGHTS
@@ -14,11 +16,12 @@ STOCK_WEIGHTS = {
 }
 
 ETF_WEIGHTS = {
-    "Momentum": 0.25,
-    "Value": 0.25,
-    "Volatility": 0.25,  # Lower is better (inverted in z-score)
-    "Size": 0.125,
-    "Cost": 0.125  # Lower expense = better (inverted in z-score)
+    "Momentum": 0.2,
+    "Value": 0.2,
+    "Volatility": 0.2,  # Lower is better (inverted in z-score)
+    "Quality": 0.2,  # Weighted quality of the top holdings (holdings_store)
+    "Size": 0.1,
+    "Cost": 0.1  # Lower expense = better (inverted in z-score)
 }
 
 
@@ -54,54 +57,252 @@ def zscore_series(series: pd.Series, baseline_value: float = None, higher_is_bet
 # --------------------------
 # Scorecard Engine
 # --------------------------
-def create_scorecard(factor_df: pd.DataFrame, is_etf: bool = True, benchmark_ticker: str = None) -> pd.DataFrame:
+def create_scorecard(factor_df: pd.DataFrame, is_etf: bool = True, benchmark_ticker: str = None,
+                     group_by=None, method: str = "zscore", winsorize: float = None) -> pd.DataFrame:
     """
     Computes a weighted factor scorecard.
     benchmark_ticker: If provided, Z-scores are calculated relative to this ticker.
+    group_by / method / winsorize: optional within-group, robust (median / MAD) or
+    winsorized normalization (normalization.py).
+    """
+    session = ScoringSession(factor_df, is_etf=is_etf, group_by=group_by, method=method, winsorize=winsorize)
+    return session.scorecard(benchmark_ticker=benchmark_ticker)
+
+
+# --------------------------
+# Scoring Session (cached z-score layer)
+# --------------------------
+LOWER_IS_BETTER = ("Volatility", "Cost")
+
+
+class TopK(NamedTuple):
+    scorecard: pd.DataFrame  # the selected rows, indexed by Rank
+    benchmark_rank: int      # the benchmark's rank in the full universe (None if absent)
+    total: int               # number of ranked tickers
+
+
+class ScoringSession:
     """
-    weights = ETF_WEIGHTS if is_etf else STOCK_WEIGHTS
+    The factor matrix of one factor_df with its normalization statistics computed once
+    (per-factor mean / std by default; see normalization.py for groups, robust scaling
+    and winsorization). Re-scoring with other weights is a small matrix-vector product; a
+    benchmark change only swaps the anchor subtracted before dividing by the (unchanged)
+    scale. With the defaults results are the same as zscore_series / the original
+    create_scorecard loop.
+
+    group_by: column of factor_df, or labels per ticker (a Series indexed by ticker, e.g.
+    fundamentals.from_etf_data(etf_data)["sector"], or a sequence in row order).
+    """
+
+    def __init__(self, factor_df: pd.DataFrame, is_etf: bool = True, group_by=None, method: str = "zscore",
+                 winsorize: float = None, min_group_size: int = 1):
+        self.weights = dict(ETF_WEIGHTS if is_etf else STOCK_WEIGHTS)
+        self.tickers = pd.Index(factor_df["Ticker"], name="Ticker")
+        self.factors = [c for c in factor_df.columns if c != "Ticker" and pd.api.types.is_numeric_dtype(factor_df[c])]
+
+        if isinstance(group_by, str):
+            group_by = factor_df[group_by].to_numpy()
+        elif isinstance(group_by, pd.Series):
+            group_by = group_by.reindex(self.tickers).to_numpy()
+        stats = normalization.row_stats(factor_df[self.factors].to_numpy(dtype=np.float64), group_by, method,
+                                        winsorize, min_group_size)
+        self.values, self.center, self.scale, self.count = stats
+        self.sign = np.array([-1.0 if f in LOWER_IS_BETTER else 1.0 for f in self.factors])
+        self._zscores: Dict[str, np.ndarray] = {}
+
+    def _benchmark_key(self, benchmark_ticker: str = None) -> str:
+        return benchmark_ticker if benchmark_ticker and benchmark_ticker in self.tickers else None
+
+    def zscores(self, benchmark_ticker: str = None) -> np.ndarray:
+        """tickers x factors z-scores, anchored to the benchmark's values if it is in the table."""
+        key = self._benchmark_key(benchmark_ticker)
+        if key not in self._zscores:
+            anchor = self.center if key is None else self.values[np.flatnonzero(self.tickers == key)[0]]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                z = (self.values - anchor) / self.scale
+            z[(self.scale == 0) | np.isnan(self.scale)] = 0.0
+            z[self.count == 0] = np.nan
+            self._zscores[key] = z * self.sign
+        return self._zscores[key]
+
+    def _weights(self, weights: Dict[str, float] = None) -> Tuple[List[str], np.ndarray]:
+        weights = self.weights if weights is None else weights
+        factors = [f for f in weights if f in self.factors]
+        return factors, np.array([weights[f] for f in factors], dtype=np.float64)
+
+    def final_scores(self, weights: Dict[str, float] = None, benchmark_ticker: str = None) -> np.ndarray:
+        """Weighted sum of z-scores per ticker (NaN z-scores count as 0)."""
+        factors, w = self._weights(weights)
+        if not factors:
+            return np.zeros(len(self.tickers))
+        z = self.zscores(benchmark_ticker)[:, [self.factors.index(f) for f in factors]]
+        return np.where(np.isnan(z), 0.0, z * w).sum(axis=1)
+
+    def ranks(self, weights: Dict[str, float] = None, benchmark_ticker: str = None) -> pd.Series:
+        scores = pd.Series(self.final_scores(weights, benchmark_ticker), index=self.tickers)
+        return scores.rank(ascending=False, method="min").astype(int)
+
+    def _table(self, positions: np.ndarray, ranks: np.ndarray, scores: np.ndarray, weights: Dict[str, float],
+               benchmark_ticker: str) -> pd.DataFrame:
+        """Scorecard rows for the given ticker positions: Ticker, factor z-scores, Final Score, Rank."""
+        factors, _ = self._weights(weights)
+        z = self.zscores(benchmark_ticker)[np.ix_(positions, [self.factors.index(f) for f in factors])]
 
-    scorecard = factor_df[["Ticker"]].copy()
-    z_scores = pd.DataFrame(index=factor_df.index)
+        table = pd.DataFrame(z, columns=factors)
+        table.insert(0, "Ticker", self.tickers.to_numpy()[positions])
+        table["Final Score"] = scores[positions]
+        table["Rank"] = ranks
+        return table
 
-    # Calculate Z-scores for each factor
-    for factor, weight in weights.items():
-        if factor in factor_df.columns:
-            # Determine if higher or lower is better
-            higher_is_better = False if factor in ["Volatility", "Cost"] else True
+    @staticmethod
+    def _display(table: pd.DataFrame) -> pd.DataFrame:
+        table = table.set_index("Rank")
+        numeric_cols = table.select_dtypes(include=[np.number]).columns
+        table[numeric_cols] = table[numeric_cols].round(2)
+        return table
 
-            # Find the benchmark's raw value for this factor to use as the 'Zero' anchor
-            baseline = None
-            if benchmark_ticker and benchmark_ticker in factor_df["Ticker"].values:
-                baseline = factor_df.loc[factor_df["Ticker"] == benchmark_ticker, factor].values[0]
+    def scorecard(self, weights: Dict[str, float] = None, benchmark_ticker: str = None) -> pd.DataFrame:
+        """create_scorecard's table: Ticker, factor z-scores, Final Score, indexed by Rank, rounded."""
+        scores = self.final_scores(weights, benchmark_ticker)
+        ranks = pd.Series(scores).rank(ascending=False, method="min").astype(int).to_numpy()
+        table = self._table(np.arange(len(scores)), ranks, scores, weights, benchmark_ticker)
+        return self._display(table.sort_values("Rank"))
 
-            # Compute Z-score
-            z = zscore_series(factor_df[factor], baseline_value=baseline, higher_is_better=higher_is_better)
+    # --------------------------
+    # Partial ranking (large universes)
+    # --------------------------
 
-            z_scores[factor] = z
-            scorecard[factor] = z
+    def _ranked_slice(self, start: int, stop: int, weights: Dict[str, float] = None,
+                      benchmark_ticker: str = None) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Scorecard rows for rank positions start..stop-1 (0-based) without sorting the whole
+        universe: partition finds the scores at the slice edges, only the rows between them
+        are sorted. Ties are broken by table position, so pages never overlap or skip rows.
+        Ranks follow rank(method='min'): 1 + number of strictly higher scores.
+        """
+        scores = self.final_scores(weights, benchmark_ticker)
+        n = len(scores)
+        start, stop = max(0, min(start, n)), max(0, min(stop, n))
+        if start >= stop:
+            return self._display(self._table(np.array([], dtype=np.int64), [], scores, weights, benchmark_ticker)), scores
 
-    # Calculate Final Score (Weighted Sum of Z-scores)
-    # Note: We only sum factors that exist in the weights dictionary
-    available_factors = [f for f in weights.keys() if f in z_scores.columns]
+        kth = [start, stop - 1] if stop - 1 > start else [start]
+        edges = -np.partition(-scores, kth)
+        high, low = edges[start], edges[stop - 1]
+        candidates = np.flatnonzero((scores <= high) & (scores >= low))
+        ordered = candidates[np.lexsort((candidates, -scores[candidates]))]
+        above = np.count_nonzero(scores > high)
+        positions = ordered[start - above:stop - above]
+        ranks = 1 + np.count_nonzero(scores[None, :] > scores[positions][:, None], axis=1)
+        return self._display(self._table(positions, ranks, scores, weights, benchmark_ticker)), scores
 
-    if available_factors:
-        # Multiply each Z-score by its weight and sum them up
-        weighted_z = z_scores[available_factors].mul(pd.Series(weights))
-        scorecard["Final Score"] = weighted_z.sum(axis=1)
+    def benchmark_rank(self, benchmark_ticker: str, weights: Dict[str, float] = None, scores: np.ndarray = None) -> int:
+        """Rank of the benchmark (None if it is not in the table), O(n)."""
+        if self._benchmark_key(benchmark_ticker) is None:
+            return None
+        if scores is None:
+            scores = self.final_scores(weights, benchmark_ticker)
+        own = scores[np.flatnonzero(self.tickers == benchmark_ticker)[0]]
+        return int(1 + np.count_nonzero(scores > own))
+
+    def top_k(self, k: int = 50, weights: Dict[str, float] = None, benchmark_ticker: str = None) -> TopK:
+        """Best k rows of the scorecard plus the benchmark's rank in the full universe."""
+        table, scores = self._ranked_slice(0, k, weights, benchmark_ticker)
+        return TopK(table, self.benchmark_rank(benchmark_ticker, scores=scores), len(scores))
+
+    def page(self, page: int = 1, page_size: int = 50, weights: Dict[str, float] = None,
+             benchmark_ticker: str = None) -> TopK:
+        """Rows of one scorecard page (1-based), so callers only format / ship what is on screen."""
+        start = (max(page, 1) - 1) * page_size
+        table, scores = self._ranked_slice(start, start + page_size, weights, benchmark_ticker)
+        return TopK(table, self.benchmark_rank(benchmark_ticker, scores=scores), len(scores))
+
+
+# --------------------------
+# Weight Scenarios (sensitivity analysis)
+# --------------------------
+class ScenarioScores(NamedTuple):
+    scores: pd.DataFrame     # scenarios x tickers, Final Score
+    ranks: pd.DataFrame      # scenarios x tickers, Rank (1 = best, ties share the lowest rank)
+    stability: pd.DataFrame  # per ticker rank statistics across scenarios
+
+
+def weight_matrix(weight_scenarios, factors: List[str] = None) -> pd.DataFrame:
+    """
+    Scenarios x factors weights from a DataFrame (one row per scenario), a list of weight
+    dicts or a dict of named weight dicts. Factors a scenario leaves out weigh 0.
+    """
+    if isinstance(weight_scenarios, pd.DataFrame):
+        weights = weight_scenarios
+    elif isinstance(weight_scenarios, dict):
+        weights = pd.DataFrame.from_dict(weight_scenarios, orient="index")
     else:
-        scorecard["Final Score"] = 0.0
+        weights = pd.DataFrame(list(weight_scenarios))
+    if factors is not None:
+        weights = weights.reindex(columns=factors)
+    return weights.fillna(0.0).astype(np.float64)
+
+
+def random_weight_scenarios(base_weights: Dict[str, float], n: int = 200, concentration: float = 50.0,
+                            seed: int = 0) -> pd.DataFrame:
+    """
+    n weight vectors drawn around base_weights (Dirichlet, same total); a higher
+    concentration keeps them closer to the base. Row 0 is the base itself.
+    """
+    factors = list(base_weights)
+    base = np.array([base_weights[f] for f in factors], dtype=np.float64)
+    total = base.sum()
+    draws = np.random.default_rng(seed).dirichlet(base / total * concentration, size=max(n - 1, 0)) * total
+    return pd.DataFrame(np.vstack([base, draws]), columns=factors)
+
+
+def rank_rows(scores: np.ndarray) -> np.ndarray:
+    """Row-wise descending ranks, ties -> lowest rank (pandas rank(ascending=False, method='min'))."""
+    order = np.argsort(-scores, axis=1, kind="stable")
+    ordered = np.take_along_axis(scores, order, axis=1)
+    positions = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    new_value = np.ones(scores.shape, dtype=bool)
+    new_value[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    first = np.maximum.accumulate(np.where(new_value, positions, 0), axis=1)
+    ranks = np.empty(scores.shape, dtype=np.int64)
+    np.put_along_axis(ranks, order, first + 1, axis=1)
+    return ranks
+
+
+def score_scenarios(factor_df: Union[pd.DataFrame, ScoringSession], weight_scenarios, benchmark_ticker: str = None,
+                    top_n: int = 10) -> ScenarioScores:
+    """
+    create_scorecard for many weight vectors at once: the z-score matrix is computed once
+    and all Final Scores come from one (scenarios x factors) @ (factors x tickers) product.
+    Row i of scores / ranks equals create_scorecard's (unrounded) Final Score / Rank under
+    the weights of scenario i.
+    """
+    session = factor_df if isinstance(factor_df, ScoringSession) else ScoringSession(factor_df)
+    weights = weight_matrix(weight_scenarios)
+    factors = [f for f in weights.columns if f in session.factors]
+    weights = weights[factors]
+
+    z = session.zscores(benchmark_ticker)[:, [session.factors.index(f) for f in factors]]
+    scores = weights.to_numpy() @ np.nan_to_num(z, nan=0.0).T  # NaN factors count as 0
+    ranks = rank_rows(scores)
 
-    # Ranking
-    scorecard["Rank"] = scorecard["Final Score"].rank(ascending=False, method="min").astype(int)
-    scorecard = scorecard.sort_values("Rank")
+    scores_df = pd.DataFrame(scores, index=weights.index, columns=session.tickers)
+    ranks_df = pd.DataFrame(ranks, index=weights.index, columns=session.tickers)
+    return ScenarioScores(scores_df, ranks_df, rank_stability(ranks_df, top_n=top_n))
 
-    # Cleanup for display
-    scorecard.set_index("Rank", inplace=True)
-    numeric_cols = scorecard.select_dtypes(include=[np.number]).columns
-    scorecard[numeric_cols] = scorecard[numeric_cols].round(2)
 
-    return scorecard
+def rank_stability(ranks: pd.DataFrame, top_n: int = 10) -> pd.DataFrame:
+    """Per ticker: mean / median / std / best / worst rank across scenarios, and the share in the top N."""
+    values = ranks.to_numpy()
+    stability = pd.DataFrame({
+        "Mean Rank": values.mean(axis=0),
+        "Median Rank": np.median(values, axis=0),
+        "Rank Std": values.std(axis=0),
+        "Best Rank": values.min(axis=0),
+        "Worst Rank": values.max(axis=0),
+        f"Top {top_n} Share": (values <= top_n).mean(axis=0),
+    }, index=ranks.columns)
+    return stability.sort_values("Mean Rank")
 
 
 # --------------------------
@@ -110,6 +311,7 @@ def create_scorecard(factor_df: pd.DataFrame, is_etf: bool = True, benchmark_tic
 if __name__ == "__main__":
     from etf_loader import load_etfs
     from factor_engine_v2 import compute_factors
+    from fundamentals import RAW_INFO
 
     tickers = ["SPY", "QQQ", "EEM", "VTI"]  # All ETFs for Cost testing
     data = load_etfs(tickers, period="5y")
@@ -117,7 +319,7 @@ if __name__ == "__main__":
 
     # 👈 TEST 1: Check raw Cost values
     print("\n=== RAW COST VALUES ===")
-    print(factor_df[['Ticker', 'Cost', 'info']].head())
+    print(factor_df[['Ticker', 'Cost']].head())
 
     # 👈 TEST 2: Check if Cost column exists and has data
     print("\n=== COST COLUMN TEST ===")
@@ -128,8 +330,7 @@ if __name__ == "__main__":
     # 👈 TEST 3: Check expenseRatio from info
     print("\n=== EXPENSE RATIO RAW DATA ===")
     for ticker in tickers:
-        info = factor_df[factor_df['Ticker'] == ticker]['info'].iloc[0]
-        expense = info.get('expenseRatio')
+        expense = RAW_INFO.get(ticker, {}).get('expenseRatio')
         print(f"{ticker}: expenseRatio = {expense}")
 
     scorecard = create_scorecard(factor_df)
@@ -0,0 +1,73 @@
+"""
+single_flight.py
+In-process request coalescing. Concurrent requests for the same key (e.g.
+("prices", "SPY", "1d")) wait on one in-flight fetch and share its result.
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Tuple
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn once per key at a time; concurrent callers block on the leader's result."""
+        owned, waiting = self.claim([key])
+        if not owned:
+            return waiting[key].result()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.fail(key, e)
+            raise
+        self.resolve(key, result)
+        return result
+
+    def claim(self, keys: Iterable[Hashable]) -> Tuple[List[Hashable], Dict[Hashable, Future]]:
+        """
+        Batch version of `do`: returns (keys the caller now owns and must resolve/fail,
+        futures for keys another caller is already fetching).
+        """
+        owned, waiting = [], {}
+        with self._lock:
+            for key in keys:
+                if key in self._inflight:
+                    waiting[key] = self._inflight[key]
+                else:
+                    self._inflight[key] = Future()
+                    owned.append(key)
+        return owned, waiting
+
+    def resolve(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            future = self._inflight.pop(key, None)
+        if future is not None:
+            future.set_result(value)
+
+    def fail(self, key: Hashable, error: Exception) -> None:
+        with self._lock:
+            future = self._inflight.pop(key, None)
+        if future is not None:
+            future.set_exception(error)
+
+    def settle(self, key: Hashable, source: Future) -> None:
+        """Resolve an owned key with the outcome of another future once it completes."""
+        def _copy(done: Future):
+            error = done.exception()
+            if error is None:
+                self.resolve(key, done.result())
+            else:
+                self.fail(key, error)
+        source.add_done_callback(_copy)
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+
+# Shared by every loader in the process
+FLIGHTS = SingleFlight()
@@ -0,0 +1,245 @@
+"""
+streaming_state.py
+Per-ticker streaming accumulators, stored next to the price file
+(data/prices/<interval>/<TICKER>.state.npz) and advanced one bar at a time:
+
+- Welford mean / M2 of daily returns     -> annual return, volatility, Sharpe
+- running peak and worst drawdown        -> max drawdown
+- running product of (1 + r)             -> cumulative return
+- ring buffer of the last RING_SIZE prices -> momentum / growth lookbacks
+
+The newest stored bar may be partial (an intraday refresh), so it is held as a provisional
+bar outside the accumulators and only folded in once a newer bar arrives. Revising it is
+free and a new daily bar costs O(1) per ticker, so the end-of-day update is proportional
+to the number of tickers, not to their history length. Metrics cover the full stored
+history, provisional bar included.
+"""
+
+import os
+import threading
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+import price_store
+from price_series import PriceSeries
+
+TRADING_DAYS = 252
+RING_SIZE = 21 * 12 + 21  # longest lookback: factor_engine's 12-1 momentum
+
+_lock = threading.Lock()
+
+
+class StreamingState:
+    __slots__ = ("last_date", "first_price", "last_price", "count", "n_returns", "mean", "m2",
+                 "peak", "max_drawdown", "growth", "ring", "pending_date", "pending_price")
+
+    def __init__(self):
+        self.last_date = np.iinfo(np.int64).min  # ns
+        self.first_price = np.nan
+        self.last_price = np.nan
+        self.count = 0  # prices seen
+        self.n_returns = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.peak = np.nan
+        self.max_drawdown = 0.0
+        self.growth = 1.0
+        self.ring = np.full(RING_SIZE, np.nan)
+        self.pending_date = np.iinfo(np.int64).min  # provisional newest bar, not in the accumulators
+        self.pending_price = np.nan
+
+    # --------------------------
+    # Construction
+    # --------------------------
+
+    @classmethod
+    def from_series(cls, series: PriceSeries) -> "StreamingState":
+        """Seed from a full history with array operations (one-off O(n)); the last bar stays provisional."""
+        state = cls()
+        values = series.values.astype(np.float64)
+        if len(values) == 0:
+            return state
+        state.pending_date, state.pending_price = int(series.dates[-1]), float(values[-1])
+        values = values[:-1]
+        if len(values) == 0:
+            return state
+        returns = values[1:] / values[:-1] - 1
+        state.last_date = int(series.dates[-2])
+        state.first_price, state.last_price = float(values[0]), float(values[-1])
+        state.count = len(values)
+        state.n_returns = len(returns)
+        if len(returns):
+            state.mean = float(returns.mean())
+            state.m2 = float(((returns - state.mean) ** 2).sum())
+            state.growth = float(np.prod(1 + returns))
+        state.peak = float(values.max())
+        state.max_drawdown = float(np.min(values / np.maximum.accumulate(values) - 1))
+        tail = values[-RING_SIZE:]
+        positions = np.arange(state.count - len(tail), state.count) % RING_SIZE
+        state.ring[positions] = tail
+        return state
+
+    # --------------------------
+    # Streaming update
+    # --------------------------
+
+    def update(self, date_ns: int, price: float) -> bool:
+        """Fold one finalized bar into the accumulators in O(1); bars at or before the last one are ignored."""
+        if date_ns <= self.last_date or not np.isfinite(price):
+            return False
+        if self.count == 0:
+            self.first_price = self.peak = price
+        else:
+            r = price / self.last_price - 1
+            self.n_returns += 1
+            delta = r - self.mean
+            self.mean += delta / self.n_returns
+            self.m2 += delta * (r - self.mean)
+            self.growth *= 1 + r
+        self.peak = max(self.peak, price)
+        self.max_drawdown = min(self.max_drawdown, price / self.peak - 1)
+        self.ring[self.count % RING_SIZE] = price
+        self.count += 1
+        self.last_price = price
+        self.last_date = date_ns
+        return True
+
+    def advance(self, series: PriceSeries) -> int:
+        """
+        Feed the bars of `series` newer than the last finalized one; returns how many were used.
+        A refetched provisional bar simply replaces the stored one; otherwise the stored one
+        is final and gets folded in first. The newest bar becomes the provisional one.
+        """
+        start = np.searchsorted(series.dates, self.last_date, side="right")
+        dates, values = series.dates[start:], series.values[start:]
+        if len(dates) == 0:
+            return 0
+        if self.has_pending and self.pending_date < dates[0]:
+            self.update(self.pending_date, self.pending_price)
+        for d, v in zip(dates[:-1], values[:-1]):
+            self.update(int(d), float(v))
+        self.pending_date, self.pending_price = int(dates[-1]), float(values[-1])
+        return len(dates)
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(np.isfinite(self.pending_price))
+
+    def current(self) -> "StreamingState":
+        """The accumulators with the provisional bar folded in (a constant-size copy)."""
+        if not self.has_pending:
+            return self
+        state = StreamingState.from_arrays(self.to_arrays())
+        state.update(state.pending_date, state.pending_price)
+        state.pending_date, state.pending_price = np.iinfo(np.int64).min, np.nan
+        return state
+
+    # --------------------------
+    # Read-outs
+    # --------------------------
+
+    def lookback(self, n: int) -> float:
+        """prices.iloc[-n] from the ring buffer (NaN without enough history)."""
+        if self.has_pending:
+            return self.current().lookback(n)
+        if n < 1 or n > RING_SIZE or n > self.count:
+            return np.nan
+        return float(self.ring[(self.count - n) % RING_SIZE])
+
+    def metrics(self, risk_free_rate: float = 0.0) -> Dict[str, float]:
+        """Same definitions as performance_analyzer.compute_metrics and the factor engines."""
+        if self.has_pending:
+            return self.current().metrics(risk_free_rate)
+        vol = np.sqrt(self.m2 / (self.n_returns - 1)) * np.sqrt(TRADING_DAYS) if self.n_returns > 1 else np.nan
+        annual_return = self.mean * TRADING_DAYS if self.n_returns else np.nan
+        return {
+            "Total Return": self.growth - 1 if self.count else np.nan,
+            "Annual Return": annual_return,
+            "Annual Volatility": vol,
+            "Sharpe Ratio": (annual_return - risk_free_rate) / vol if vol else np.nan,
+            "MaxDrawdown": self.max_drawdown if self.count else np.nan,
+            "Momentum": self.last_price / self.lookback(252) - 1,
+            "Momentum12_1": self.lookback(21) / self.lookback(RING_SIZE) - 1,
+            "Growth": self.last_price / self.lookback(252) - 1,
+        }
+
+    # --------------------------
+    # Persistence
+    # --------------------------
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {name: np.asarray(getattr(self, name)) for name in self.__slots__}
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "StreamingState":
+        state = cls()
+        for name in cls.__slots__:
+            value = arrays[name]
+            setattr(state, name, value.copy() if name == "ring" else value.item())
+        return state
+
+
+# --------------------------
+# Store next to the price files
+# --------------------------
+
+def state_path(ticker: str, interval: str = "1d"):
+    return price_store.store_path(ticker, interval).with_suffix(".state.npz")
+
+
+def load_state(ticker: str, interval: str = "1d") -> StreamingState:
+    path = state_path(ticker, interval)
+    if not path.exists():
+        return None
+    try:
+        with np.load(path) as arrays:
+            return StreamingState.from_arrays(arrays)
+    except Exception as e:
+        print(f"⚠️ Corrupt streaming state for {ticker}, reseeding: {e}")
+        return None
+
+
+def save_state(ticker: str, interval: str, state: StreamingState) -> None:
+    path = state_path(ticker, interval)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        np.savez(f, **state.to_arrays())
+    os.replace(tmp, path)
+
+
+def on_append(ticker: str, interval: str, combined: pd.DataFrame, new_bars: pd.DataFrame) -> None:
+    """
+    price_store hook: advance the stored state by the new bars only. The refetch starts at
+    the last finalized bar (price_store.refresh_start); the provisional bar after it may
+    change freely. Only a revised finalized bar reseeds the state from the full history.
+    """
+    new = PriceSeries.from_frame(new_bars)
+    with _lock:
+        state = load_state(ticker, interval)
+        if state is not None and not new.empty:
+            overlap = new.dates <= state.last_date
+            revised = overlap.any() and (
+                new.dates[overlap][-1] != state.last_date
+                or not np.isclose(new.values[overlap][-1], state.last_price, rtol=1e-9, atol=0)
+            )
+            if not revised:
+                state.advance(new)
+                save_state(ticker, interval, state)
+                return
+        save_state(ticker, interval, StreamingState.from_series(PriceSeries.from_frame(combined)))
+
+
+price_store.APPEND_HOOKS.append(on_append)
+
+
+def universe_metrics(tickers: Iterable[str], interval: str = "1d", risk_free_rate: float = 0.0) -> pd.DataFrame:
+    """Full-history metrics for many tickers straight from their stored states (no price reads)."""
+    rows = {}
+    for ticker in tickers:
+        state = load_state(ticker, interval)
+        if state is not None:
+            rows[ticker] = state.metrics(risk_free_rate)
+    return pd.DataFrame.from_dict(rows, orient="index")
@@ -0,0 +1,86 @@
+# ---------------------------
+# Circuit breaker checks (no network)
+# ---------------------------
+# yf.download never raises: per-symbol errors are caught and logged by yfinance. These
+# checks simulate a refused connection and unknown symbols by patching Ticker.history
+# and make sure only the outage opens the breaker. Run: python test_breaker.py
+
+from types import SimpleNamespace
+
+import pandas as pd
+import yfinance as yf
+from curl_cffi.requests.exceptions import ConnectionError as CurlConnectionError
+
+import etf_loader
+from fetch_executor import BREAKER_THRESHOLD, FETCH_LATENCY, UpstreamUnavailable, breaker
+
+TICKERS = ["SPY", "QQQ", "IWM"]
+
+checks = []
+
+
+def check(name, ok):
+    checks.append((name, ok))
+    print(f"{'✅' if ok else '❌'} {name}")
+
+
+def refused(self, *args, **kwargs):
+    raise CurlConnectionError("Failed to perform, curl: (7) Failed to connect to query2.finance.yahoo.com "
+                              "port 443: Connection refused")
+
+
+def unknown_symbol(self, *args, **kwargs):
+    # What yfinance does for a delisted / unknown symbol: no exception, an error note
+    self._price_history = SimpleNamespace(_last_error="possibly delisted; no price data found")
+    return pd.DataFrame()
+
+
+def attempt(fn, *args, **kwargs):
+    try:
+        fn(*args, **kwargs)
+    except Exception as e:
+        return e
+    return None
+
+
+def reset():
+    breaker().record_success()
+
+
+# ---------------------------
+# 1. Unknown symbols are not an outage
+# ---------------------------
+print("\n🔍 Unknown symbols ...")
+reset()
+yf.Ticker.history = unknown_symbol
+for i in range(BREAKER_THRESHOLD + 2):
+    attempt(etf_loader.download_prices, f"ZZZ{i}", period="1y")
+    attempt(etf_loader.download_prices_batch, [f"ZZA{i}", f"ZZB{i}"], period="1y")
+check("breaker stays closed after unknown symbols", not breaker().is_open)
+
+
+# ---------------------------
+# 2. A refused connection opens the breaker
+# ---------------------------
+print("\n🔌 Refused connection ...")
+reset()
+FETCH_LATENCY._samples.clear()
+yf.Ticker.history = refused
+first = attempt(etf_loader.download_prices, "SPY", period="1y")
+for _ in range(BREAKER_THRESHOLD):
+    attempt(etf_loader.download_prices_batch, TICKERS, period="1y")
+check("single download raises an outage error", type(first).__name__ == "UpstreamError")
+check("breaker opens after refused connections", breaker().is_open)
+check("latency window records the failures", FETCH_LATENCY.summary()["success_rate"] == 0.0)
+check("open breaker fails fast", isinstance(attempt(etf_loader.download_prices, "SPY", period="1y"),
+                                            UpstreamUnavailable))
+reset()
+
+
+# ---------------------------
+# 3. Summary
+# ---------------------------
+failed = [name for name, ok in checks if not ok]
+print(f"\n{len(checks) - len(failed)}/{len(checks)} checks passed")
+if failed:
+    raise SystemExit(1)
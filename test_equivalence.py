@@ -0,0 +1,218 @@
+# ---------------------------
+# Equivalence checks (no network)
+# ---------------------------
+# The vectorised / parallel / paginated paths against the original per-ticker loops,
+# on synthetic prices and info. Run: python test_equivalence.py
+
+import numpy as np
+import pandas as pd
+
+import factor_engine
+import factor_engine_v2
+from screener_engine_v2 import (
+    ETF_WEIGHTS, STOCK_WEIGHTS, ScoringSession, create_scorecard, random_weight_scenarios,
+    score_scenarios, zscore_series,
+)
+
+SEED = 7
+N_ETFS, N_STOCKS = 40, 40
+PAGE_SIZE = 15
+
+rng = np.random.default_rng(SEED)
+
+
+# ---------------------------
+# 1. Synthetic universe
+# ---------------------------
+def synthetic_prices(n_bars: int) -> pd.DataFrame:
+    dates = pd.bdate_range(end="2024-12-31", periods=n_bars)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.012, n_bars)))
+    prices[rng.random(n_bars) < 0.01] = np.nan  # missing bars
+    return pd.DataFrame({"Adj Close": prices}, index=dates)
+
+
+def maybe(value, p_missing: float = 0.2):
+    return None if rng.random() < p_missing else value
+
+
+def synthetic_info(is_etf: bool) -> dict:
+    info = {
+        "quoteType": "ETF" if is_etf else "EQUITY",
+        "priceToBook": maybe(float(rng.uniform(0.5, 8)), 0.4),
+        "trailingPE": maybe(float(rng.uniform(5, 40))),
+        "marketCap": maybe(float(rng.uniform(1e8, 1e12))),
+    }
+    if is_etf:
+        info["netExpenseRatio"] = maybe(float(rng.uniform(0.0003, 0.01)), 0.5)
+        info["expenseRatio"] = maybe(float(rng.uniform(0.0003, 0.01)))
+    else:
+        info["returnOnEquity"] = maybe(float(rng.normal(0.12, 0.08)), 0.3)
+        info["returnOnAssets"] = maybe(float(rng.normal(0.05, 0.03)))
+        info["earningsQuarterlyGrowth"] = maybe(float(rng.normal(0.05, 0.2)), 0.3)
+        info["revenueGrowth"] = maybe(float(rng.normal(0.05, 0.1)))
+    return info
+
+
+etf_data = {}
+for i in range(N_ETFS + N_STOCKS):
+    ticker = f"{'E' if i < N_ETFS else 'S'}{i:03d}"
+    etf_data[ticker] = {
+        "prices": synthetic_prices(int(rng.integers(100, 1500))),  # some too short for Momentum
+        "info": synthetic_info(i < N_ETFS),
+    }
+
+
+# ---------------------------
+# 2. Reference implementations (the original loops)
+# ---------------------------
+def legacy_factors_v2(etf_data, period="5y") -> pd.DataFrame:
+    """factor_engine_v2.compute_factors before the typed fundamentals table / panel paths."""
+    f = factor_engine_v2
+    rows = []
+    for ticker, data in etf_data.items():
+        prices = data["prices"]["Adj Close"]
+        info = data["info"]
+        is_etf = info.get("quoteType", "").lower() == "etf"
+        rows.append({
+            "Ticker": ticker,
+            "Momentum": f.safe_scalar(f.compute_momentum(prices, period=period)),
+            "Value": f.safe_scalar(f.compute_value(info)),
+            "Volatility": f.safe_scalar(f.compute_volatility(prices)),
+            "Growth": np.nan if is_etf else f.safe_scalar(f.compute_growth(info)),
+            "Size": f.safe_scalar(f.compute_size(info)),
+            "Cost": f.safe_scalar(f.compute_cost(info)) if is_etf else np.nan,
+            "Quality": np.nan if is_etf else f.safe_scalar(f.compute_quality(info)),
+        })
+    return pd.DataFrame(rows).sort_values("Ticker").reset_index(drop=True)
+
+
+def legacy_scorecard(factor_df, is_etf=True, benchmark_ticker=None) -> pd.DataFrame:
+    """create_scorecard before ScoringSession: one zscore_series call per factor."""
+    weights = ETF_WEIGHTS if is_etf else STOCK_WEIGHTS
+    scorecard = factor_df[["Ticker"]].copy()
+    z_scores = pd.DataFrame(index=factor_df.index)
+    for factor in weights:
+        if factor in factor_df.columns:
+            baseline = None
+            if benchmark_ticker and benchmark_ticker in factor_df["Ticker"].values:
+                baseline = factor_df.loc[factor_df["Ticker"] == benchmark_ticker, factor].values[0]
+            z = zscore_series(factor_df[factor], baseline_value=baseline,
+                              higher_is_better=factor not in ["Volatility", "Cost"])
+            z_scores[factor] = z
+            scorecard[factor] = z
+    available = [f for f in weights if f in z_scores.columns]
+    scorecard["Final Score"] = z_scores[available].mul(pd.Series(weights)).sum(axis=1)
+    scorecard["Rank"] = scorecard["Final Score"].rank(ascending=False, method="min").astype(int)
+    scorecard = scorecard.sort_values("Rank").set_index("Rank")
+    numeric_cols = scorecard.select_dtypes(include=[np.number]).columns
+    scorecard[numeric_cols] = scorecard[numeric_cols].round(2)
+    return scorecard
+
+
+def by_rank(table: pd.DataFrame) -> pd.DataFrame:
+    """Tied rows may come out in either order: compare on (Rank, Ticker)."""
+    return table.reset_index().sort_values(["Rank", "Ticker"]).reset_index(drop=True)
+
+
+checks = []
+
+
+def check(name, fn):
+    try:
+        fn()
+        checks.append((name, True))
+        print(f"✅ {name}")
+    except AssertionError as e:
+        checks.append((name, False))
+        print(f"❌ {name}\n{e}")
+
+
+# ---------------------------
+# 3. Factor engines
+# ---------------------------
+print("\n⚡ Factor engines ...")
+reference = legacy_factors_v2(etf_data)
+serial = factor_engine_v2.compute_factors(etf_data, etf_quality=False)
+panel = factor_engine_v2.compute_factors_panel(etf_data, etf_quality=False, processes=1)
+parallel = factor_engine_v2.compute_factors_panel(etf_data, etf_quality=False, processes=2)
+
+check("v2 compute_factors == original loop", lambda: pd.testing.assert_frame_equal(serial, reference, check_exact=True))
+check("v2 compute_factors_panel == compute_factors", lambda: pd.testing.assert_frame_equal(panel, serial, rtol=1e-12))
+check("v2 parallel_screen == compute_factors_panel", lambda: pd.testing.assert_frame_equal(parallel, panel, check_exact=True))
+
+v1_data = {t: d for t, d in etf_data.items() if len(d["prices"]) > 300}
+check("v1 compute_factors_panel == compute_factors", lambda: pd.testing.assert_frame_equal(
+    factor_engine.compute_factors_panel(v1_data), factor_engine.compute_factors(v1_data), rtol=1e-12))
+
+
+# ---------------------------
+# 4. Scorecards
+# ---------------------------
+print("\n📊 Scorecards ...")
+etfs = serial[serial["Ticker"].str.startswith("E")].reset_index(drop=True)
+stocks = serial[serial["Ticker"].str.startswith("S")].reset_index(drop=True)
+etfs = pd.concat([etfs, etfs.iloc[[3]].assign(Ticker="E999")], ignore_index=True)  # a tie
+
+for label, factor_df, is_etf in (("ETF", etfs, True), ("stock", stocks, False)):
+    for benchmark in (None, factor_df["Ticker"].iloc[5]):
+        check(f"create_scorecard == original loop ({label}, benchmark={benchmark})", lambda: pd.testing.assert_frame_equal(
+            by_rank(create_scorecard(factor_df, is_etf=is_etf, benchmark_ticker=benchmark)),
+            by_rank(legacy_scorecard(factor_df, is_etf=is_etf, benchmark_ticker=benchmark)), check_exact=True))
+
+session = ScoringSession(etfs)
+benchmark = etfs["Ticker"].iloc[5]
+full = by_rank(session.scorecard(benchmark_ticker=benchmark))
+full_ranks = session.ranks(benchmark_ticker=benchmark)
+
+
+def check_pages():
+    n_pages = -(-len(etfs) // PAGE_SIZE)
+    pages = [session.page(p, PAGE_SIZE, benchmark_ticker=benchmark) for p in range(1, n_pages + 1)]
+    pd.testing.assert_frame_equal(by_rank(pd.concat([p.scorecard for p in pages])), full, check_exact=True)
+    assert all(p.total == len(etfs) for p in pages)
+    assert all(p.benchmark_rank == full_ranks[benchmark] for p in pages)
+    assert session.page(n_pages + 1, PAGE_SIZE).scorecard.empty
+
+
+def check_pages_with_ties():
+    # 70% of the tickers have no factor data and all score exactly 0
+    n, page_size = 500, 50
+    tied = pd.DataFrame({"Ticker": [f"T{i:03d}" for i in range(n)]})
+    for factor in ETF_WEIGHTS:
+        tied[factor] = np.where(rng.random(n) < 0.7, np.nan, rng.integers(0, 5, n).astype(float))
+    tied.loc[rng.random(n) < 0.7, list(ETF_WEIGHTS)] = np.nan
+    tied_session = ScoringSession(tied)
+    pages = [tied_session.page(p, page_size).scorecard for p in range(1, n // page_size + 1)]
+    tickers = pd.concat(pages)["Ticker"]
+    assert tickers.is_unique and set(tickers) == set(tied["Ticker"]), f"{tickers.nunique()} unique of {n}"
+    pd.testing.assert_frame_equal(by_rank(pd.concat(pages)), by_rank(tied_session.scorecard()), check_exact=True)
+
+
+def check_top_k():
+    for k in (1, 10, len(etfs), len(etfs) + 5):
+        top = session.top_k(k, benchmark_ticker=benchmark)
+        pd.testing.assert_frame_equal(by_rank(top.scorecard), full.head(k), check_exact=True)
+        assert top.benchmark_rank == full_ranks[benchmark]
+
+
+def check_scenarios():
+    scenarios = random_weight_scenarios(ETF_WEIGHTS, n=25, seed=SEED)
+    result = score_scenarios(session, scenarios, benchmark_ticker=benchmark)
+    for i, weights in scenarios.iterrows():
+        ranks = session.ranks(weights.to_dict(), benchmark_ticker=benchmark)
+        np.testing.assert_array_equal(result.ranks.loc[i].to_numpy(), ranks.to_numpy())
+
+
+check("ScoringSession.page == full sort", check_pages)
+check("ScoringSession.page covers the universe once (heavy ties)", check_pages_with_ties)
+check("ScoringSession.top_k == full sort", check_top_k)
+check("score_scenarios == per-scenario ranks", check_scenarios)
+
+
+# ---------------------------
+# 5. Summary
+# ---------------------------
+failed = [name for name, ok in checks if not ok]
+print(f"\n{len(checks) - len(failed)}/{len(checks)} checks passed")
+if failed:
+    raise SystemExit(1)
@@ -0,0 +1,129 @@
+"""
+warmup.py
+Headless cache warm-up: loads every ticker of a universe file into the local price
+store and the in-process price/info caches, with bounded concurrency.
+
+    python warmup.py universe.txt --interval 1d --concurrency 4
+
+Meant for the container start hook. The Parquet store persists across processes, so a
+separate warm-up run still saves the first page load its downloads; app.py can also run
+`warm_up` in-process (WARMUP_UNIVERSE) so the memory caches are hot as well.
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple
+
+from etf_loader import fetch_info_data, fetch_price_data
+from market_cache import INFO_CACHE, PRICE_CACHE, canonical_tickers
+
+DEFAULT_CONCURRENCY = 4
+
+
+class WarmupResult(NamedTuple):
+    ticker: str
+    price_seconds: float
+    info_seconds: float
+    bars: int
+    error: str = None
+
+
+# --------------------------
+# Universe file
+# --------------------------
+
+def read_universe(path: str) -> List[str]:
+    """One ticker per line (commas also accepted); "#" starts a comment."""
+    tickers = []
+    for line in Path(path).read_text().splitlines():
+        line = line.split("#", 1)[0]
+        tickers.extend(line.replace(",", " ").split())
+    return list(canonical_tickers(tickers))
+
+
+# --------------------------
+# Warm-up
+# --------------------------
+
+def warm_ticker(ticker: str, interval: str = "1d") -> WarmupResult:
+    """Fetch one ticker's full price history and info through the shared single-flight loaders."""
+    errors, bars = [], 0
+
+    start = time.perf_counter()
+    try:
+        bars = len(fetch_price_data(ticker, interval))
+    except Exception as e:
+        errors.append(f"prices: {e}")
+    price_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        fetch_info_data(ticker)
+    except Exception as e:
+        errors.append(f"info: {e}")
+    info_seconds = time.perf_counter() - start
+
+    return WarmupResult(ticker, price_seconds, info_seconds, bars, "; ".join(errors) or None)
+
+
+def warm_up(tickers: List[str], interval: str = "1d", concurrency: int = DEFAULT_CONCURRENCY) -> List[WarmupResult]:
+    """
+    At most `concurrency` tickers in flight; the fetch executor's rate limiter and
+    circuit breaker still apply on top of that.
+    """
+    tickers = canonical_tickers(tickers)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="warmup") as pool:
+        return list(pool.map(lambda t: warm_ticker(t, interval), tickers))
+
+
+def summarize(results: List[WarmupResult], elapsed: float) -> Dict[str, Any]:
+    failed = [r for r in results if r.error]
+    return {
+        "tickers": len(results),
+        "failed": len(failed),
+        "elapsed_seconds": round(elapsed, 2),
+        "price_cache": PRICE_CACHE.stats(),
+        "info_cache": INFO_CACHE.stats(),
+    }
+
+
+def print_report(results: List[WarmupResult], elapsed: float) -> None:
+    print(f"{'Ticker':<10}{'Prices (s)':>12}{'Info (s)':>10}{'Bars':>8}  Status")
+    for r in sorted(results, key=lambda r: r.price_seconds + r.info_seconds, reverse=True):
+        status = f"❌ {r.error}" if r.error else "✅"
+        print(f"{r.ticker:<10}{r.price_seconds:>12.2f}{r.info_seconds:>10.2f}{r.bars:>8}  {status}")
+
+    summary = summarize(results, elapsed)
+    print(f"\n📥 Warmed {summary['tickers'] - summary['failed']}/{summary['tickers']} tickers "
+          f"in {summary['elapsed_seconds']}s")
+    for stats in (summary["price_cache"], summary["info_cache"]):
+        print(f"   {stats['name']} cache: {stats['entries']} entries, {stats['size_bytes'] / 1024 ** 2:.1f} MB")
+
+
+# --------------------------
+# CLI
+# --------------------------
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Prefetch prices and info for a ticker universe.")
+    parser.add_argument("universe", help="text file with one ticker per line")
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--strict", action="store_true", help="exit with status 1 if any ticker failed")
+    args = parser.parse_args(argv)
+
+    tickers = read_universe(args.universe)
+    print(f"⬇️ Warming {len(tickers)} tickers ({args.interval}, concurrency {args.concurrency})")
+    start = time.perf_counter()
+    results = warm_up(tickers, args.interval, args.concurrency)
+    print_report(results, time.perf_counter() - start)
+
+    failed = any(r.error for r in results)
+    return 1 if args.strict and failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())